@@ -0,0 +1,29 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT: int = 60 * 15
+
+
+def user_cache_key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кэша.
+
+    Запись сбрасывается при любом сохранении пользователя, в том числе
+    при смене пароля, поэтому проверка хэша сессии видит новый пароль.
+    Сброс доходит до всех процессов, только если кэш у них общий:
+    с LocMemCache каждый воркер держал бы свою копию до
+    USER_CACHE_TIMEOUT. Поэтому settings_production отказывается
+    загружаться с таким сочетанием.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,138 @@
+"""Бэкенды кэша с метриками попаданий для /metrics и спанами трассировки.
+
+InstrumentedLocMemCache живёт в памяти одного процесса и годится только
+для разработки и тестов. Несколько воркеров должны делить кэш: иначе
+пользователь сессии, лимиты запросов и события pubsub у каждого воркера
+свои. Для них есть файловый кэш — общий для процессов одного сервера —
+и memcached для нескольких серверов.
+"""
+import fcntl
+import hashlib
+import os
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyLibMCCache
+
+from . import tracing
+from .metrics import registry
+
+FRAGMENT_PREFIX = 'template.cache.'
+MAX_KEY_LENGTH: int = 250
+# Число файлов блокировок файлового кэша: ключи делят их по хэшу.
+LOCK_STRIPES: int = 64
+
+
+def key_namespace(key) -> str:
+    """Пространство ключа: фрагмент шаблона или префикс до двоеточия."""
+    if key.startswith(FRAGMENT_PREFIX):
+        return 'fragment:' + key[len(FRAGMENT_PREFIX):].split('.', 1)[0]
+    return key.split(':', 1)[0]
+
+
+class MetricsCacheMixin:
+    """Считает чтения через get.
+
+    BaseCache.get_many тоже читает через get; бэкенду со своим get_many
+    понадобится учитывать и его.
+    """
+
+    def get(self, key, default=None, version=None):
+        marker = object()
+        value = super().get(key, marker, version)
+        registry.inc('cache_requests_total', namespace=key_namespace(key),
+                     result='miss' if value is marker else 'hit')
+        return default if value is marker else value
+
+
+def describe_keys(keys) -> str:
+    if not isinstance(keys, str):
+        keys = ' '.join(map(str, keys))
+    return keys[:MAX_KEY_LENGTH]
+
+
+def traced(operation):
+    def method(self, keys, *args, **kwargs):
+        with tracing.span(f'cache.{operation}', tracing.CLIENT,
+                          {'cache.key': describe_keys(keys)}):
+            return getattr(super(TracingCacheMixin, self), operation)(
+                keys, *args, **kwargs)
+    method.__name__ = operation
+    return method
+
+
+class TracingCacheMixin:
+    """Спан на каждую операцию кэша."""
+
+    get = traced('get')
+    get_many = traced('get_many')
+    set = traced('set')
+    set_many = traced('set_many')
+    add = traced('add')
+    incr = traced('incr')
+    touch = traced('touch')
+    delete = traced('delete')
+    delete_many = traced('delete_many')
+
+
+class InstrumentedLocMemCache(TracingCacheMixin, MetricsCacheMixin,
+                              LocMemCache):
+    pass
+
+
+class LockingFileBasedCache(FileBasedCache):
+    """Файловый кэш с атомарными add и incr.
+
+    В FileBasedCache это чтение и запись без блокировки: два процесса
+    могут одновременно получить одно значение счётчика. Здесь операция
+    выполняется под flock одного из LOCK_STRIPES файлов. incr к тому же
+    сохраняет срок записи, а не ставит TIMEOUT по умолчанию, как
+    BaseCache.incr: счётчик без срока не должен пропадать.
+    """
+
+    @contextmanager
+    def lock(self, key, version):
+        key = self.make_key(key, version)
+        stripe = int(hashlib.md5(key.encode()).hexdigest(), 16) % LOCK_STRIPES
+        directory = os.path.join(self._dir, 'locks')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{stripe}.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.lock(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.lock(key, version):
+            try:
+                with open(self._key_to_file(key, version), 'rb') as file:
+                    expiry = pickle.load(file)
+                    value = pickle.loads(zlib.decompress(file.read()))
+            except FileNotFoundError:
+                value = None
+            if value is None or expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            timeout = None if expiry is None else expiry - time.time()
+            self.set(key, value, timeout, version)
+            return value
+
+
+class InstrumentedFileBasedCache(TracingCacheMixin, MetricsCacheMixin,
+                                 LockingFileBasedCache):
+    pass
+
+
+class InstrumentedPyLibMCCache(TracingCacheMixin, MetricsCacheMixin,
+                               PyLibMCCache):
+    pass
@@ -0,0 +1,124 @@
+"""Счётчики с отложенной записью в базу.
+
+Инкременты копятся в памяти процесса и записываются пачкой, когда
+с прошлой записи прошло COUNTER_FLUSH_INTERVAL секунд или накопилось
+COUNTER_FLUSH_THRESHOLD инкрементов. Одна пачка — по одному UPDATE
+на модель и величину прироста, без блокировки строк на каждый просмотр.
+
+Запросы проверяют срок сами, а start_timer запускает поток, который
+записывает пачку и в процессе без запросов; воркеры gunicorn запускают
+его в post_worker_init и записывают остаток в worker_exit. Счётчики
+приблизительные: при аварийной остановке процесса или убийстве воркера
+по timeout теряется до COUNTER_FLUSH_INTERVAL секунд или
+COUNTER_FLUSH_THRESHOLD инкрементов. Пачка, которую не удалось записать,
+возвращается в буфер и записывается со следующей.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, models, transaction
+
+
+class CounterBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(lambda: defaultdict(int))
+        self.increments = 0
+        self.flushed_at = time.monotonic()
+        self.timer_pid = None
+
+    def incr(self, model, pk, field='views', amount=1):
+        with self.lock:
+            self.pending[model, field][pk] += amount
+            self.increments += 1
+            due = (
+                self.increments >= settings.COUNTER_FLUSH_THRESHOLD
+                or time.monotonic() - self.flushed_at
+                >= settings.COUNTER_FLUSH_INTERVAL
+            )
+        if due:
+            try:
+                self.flush()
+            except DatabaseError:
+                # Пачка вернулась в буфер, а запрос не должен падать
+                # из-за счётчика.
+                pass
+
+    def get_pending(self, model, pk, field='views') -> int:
+        """Ещё не записанный прирост: прибавляется к значению из базы."""
+        with self.lock:
+            counts = self.pending.get((model, field))
+            return counts.get(pk, 0) if counts else 0
+
+    def flush(self):
+        """Записывает пачку; при ошибке базы возвращает остаток в буфер."""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(
+                lambda: defaultdict(int))
+            self.increments = 0
+            self.flushed_at = time.monotonic()
+        batches = list(pending.items())
+        for index, ((model, field), counts) in enumerate(batches):
+            try:
+                with transaction.atomic():
+                    write_counts(model, field, counts)
+            except DatabaseError:
+                self.restore(batches[index:])
+                raise
+
+    def restore(self, batches):
+        with self.lock:
+            for key, counts in batches:
+                for pk, amount in counts.items():
+                    self.pending[key][pk] += amount
+
+    def start_timer(self):
+        """Запускает запись по таймеру в текущем процессе, один раз.
+
+        Поток не переживает fork, поэтому вызывается уже в воркере.
+        """
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        threading.Thread(
+            target=self.run_timer, name='counter-flush', daemon=True).start()
+
+    def run_timer(self):
+        while True:
+            time.sleep(settings.COUNTER_FLUSH_INTERVAL)
+            if (time.monotonic() - self.flushed_at
+                    < settings.COUNTER_FLUSH_INTERVAL):
+                # Пачку недавно записал запрос.
+                continue
+            try:
+                self.flush()
+            except DatabaseError:
+                # Пачка вернулась в буфер, запишется в следующий раз.
+                pass
+            finally:
+                connection.close()
+
+
+def write_counts(model, field, counts):
+    if getattr(model, 'counter_autocreate', False):
+        # Первичный ключ такой модели — связь с объектом, которого
+        # к моменту записи может уже не быть.
+        owners = model._meta.pk.related_model._default_manager.filter(
+            pk__in=list(counts)).values_list('pk', flat=True)
+        model._default_manager.bulk_create(
+            [model(pk=pk) for pk in owners], ignore_conflicts=True)
+    by_amount = defaultdict(list)
+    for pk, amount in counts.items():
+        by_amount[amount].append(pk)
+    for amount, pks in by_amount.items():
+        queryset = model._default_manager.filter(pk__in=pks)
+        # Базовый update: счётчик просмотров не меняет версию объекта.
+        models.QuerySet.update(
+            queryset, **{field: models.F(field) + amount})
+
+
+view_counter = CounterBuffer()
@@ -0,0 +1,77 @@
+"""Хэшеры паролей с настраиваемой стоимостью и ограничением нагрузки.
+
+Стоимость берётся из настроек PASSWORD_ARGON2_* и PASSWORD_PBKDF2_ITERATIONS.
+Django пересчитывает хэш при входе, если стоимость в нём отличается от
+настроенной или хэшер не первый в PASSWORD_HASHERS.
+
+Одновременно в процессе считается не больше PASSWORD_HASHING_CONCURRENCY
+хэшей. Остальные запросы ждут свободного места PASSWORD_HASHING_WAIT секунд
+и получают PasswordHashingBusy, а не копятся в очереди воркера.
+PasswordHashingBusyMiddleware превращает её в ответ 503 с Retry-After.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+slots = None
+slots_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    """Все места для вычисления хэшей заняты."""
+
+
+def get_slots():
+    global slots
+    with slots_lock:
+        if slots is None:
+            slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASHING_CONCURRENCY or os.cpu_count() or 1)
+        return slots
+
+
+@contextmanager
+def hashing_slot():
+    semaphore = get_slots()
+    if not semaphore.acquire(timeout=settings.PASSWORD_HASHING_WAIT):
+        raise PasswordHashingBusy
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        # verify и harden_runtime тоже считают хэш через encode.
+        with hashing_slot():
+            return super().encode(password, salt, iterations)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+    def encode(self, password, salt):
+        with hashing_slot():
+            return super().encode(password, salt)
+
+    def verify(self, password, encoded):
+        with hashing_slot():
+            return super().verify(password, encoded)
@@ -0,0 +1,193 @@
+"""Фоновые задачи в таблице Job.
+
+Функция-задача объявляется декоратором `@job` и ставится в очередь одним
+вызовом: `update_ranking.delay()`. Аргументы должны сериализоваться
+в JSON, поэтому вместо объектов передаются их id. Задача попадает
+в ту же транзакцию, что и вызвавший её код, и не запустится раньше
+её коммита.
+
+Задачи выполняет `manage.py runworker`. Упавшая задача повторяется
+с удваивающейся паузой, пока не исчерпает max_attempts. Пока задача
+выполняется, её процесс раз в JOB_HEARTBEAT секунд отмечает в ней,
+что жив; задача без отметки дольше JOB_TIMEOUT секунд считается
+упавшей вместе с процессом. Долгая задача живого процесса поэтому
+не перезапускается, сколько бы она ни шла. Функции из
+JOB_SCHEDULE ставятся в очередь не чаще раза в заданный интервал.
+"""
+import json
+import threading
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import tracing
+from .metrics import registry
+from .models import Job
+
+
+def job(func=None, *, max_attempts=None):
+    """Декоратор функции-задачи, добавляет ей delay и schedule."""
+    if func is None:
+        return partial(job, max_attempts=max_attempts)
+    func.job_name = f'{func.__module__}.{func.__qualname__}'
+
+    def delay(*args, **kwargs):
+        return enqueue(func.job_name, args, kwargs, max_attempts=max_attempts)
+
+    def schedule(run_at, *args, **kwargs):
+        return enqueue(func.job_name, args, kwargs, run_at=run_at,
+                       max_attempts=max_attempts)
+
+    func.delay = delay
+    func.schedule = schedule
+    return func
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, max_attempts=None):
+    return Job.objects.create(
+        name=name,
+        arguments=json.dumps([list(args), kwargs or {}]),
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts) -> timedelta:
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim(limit) -> list:
+    """Забирает до limit готовых задач, возвращает их id.
+
+    Каждая задача забирается условным UPDATE, так что несколько
+    процессов не выполнят одну задачу дважды.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now,
+    ).values_list('id', flat=True)[:limit]
+    return [
+        pk for pk in list(due)
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started=now, heartbeat=now,
+            attempts=F('attempts') + 1)
+    ]
+
+
+class Heartbeat(threading.Thread):
+    """Раз в JOB_HEARTBEAT секунд отмечает, что задача pk выполняется."""
+
+    def __init__(self, pk):
+        super().__init__(name=f'heartbeat-{pk}', daemon=True)
+        self.pk = pk
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT):
+                try:
+                    Job.objects.filter(pk=self.pk, status=Job.RUNNING).update(
+                        heartbeat=timezone.now())
+                except DatabaseError:
+                    # База занята записью самой задачи; отметка пропускается,
+                    # JOB_TIMEOUT вмещает несколько отметок.
+                    pass
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(pk) -> str:
+    """Выполняет забранную задачу и сохраняет результат, возвращает статус."""
+    task = Job.objects.get(pk=pk)
+    start = time.perf_counter()
+    heartbeat = Heartbeat(pk)
+    heartbeat.start()
+    try:
+        with tracing.trace(task.name, attributes={'job.id': task.pk}):
+            func = import_string(task.name)
+            if getattr(func, 'job_name', None) != task.name:
+                raise ValueError(f'{task.name} не объявлена через @job')
+            args, kwargs = json.loads(task.arguments)
+            func(*args, **kwargs)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = Job.QUEUED
+            task.run_at = timezone.now() + retry_delay(task.attempts)
+        else:
+            task.status = Job.FAILED
+    else:
+        task.status = Job.DONE
+    finally:
+        heartbeat.stop()
+    task.duration = time.perf_counter() - start
+    task.save(update_fields=('status', 'run_at', 'duration', 'last_error'))
+    registry.observe('job_duration_seconds', task.duration,
+                     name=task.name, status=task.status)
+    registry.maybe_flush()
+    return task.status
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, процесс которых перестал отмечаться."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat__lt=now - timedelta(seconds=settings.JOB_TIMEOUT),
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Процесс задачи завершился')
+    stale.update(
+        status=Job.QUEUED, run_at=now, last_error='Процесс задачи завершился')
+
+
+def schedule_periodic():
+    now = timezone.now()
+    for name, interval in settings.JOB_SCHEDULE.items():
+        recent = Job.objects.filter(name=name).filter(
+            Q(status__in=(Job.QUEUED, Job.RUNNING))
+            | Q(run_at__gt=now - timedelta(seconds=interval))
+        )
+        if not recent.exists():
+            enqueue(name)
+
+
+def cleanup():
+    """Удаляет выполненные задачи старше JOB_KEEP секунд."""
+    Job.objects.filter(
+        status=Job.DONE,
+        run_at__lt=timezone.now() - timedelta(seconds=settings.JOB_KEEP),
+    ).delete()
+
+
+def run_pending() -> int:
+    """Выполняет в текущем процессе все готовые задачи, возвращает их число."""
+    count = 0
+    while True:
+        claimed = claim(100)
+        if not claimed:
+            return count
+        for pk in claimed:
+            run_job(pk)
+        count += len(claimed)
+
+
+def job_stats():
+    """Число запусков, ошибок и время выполнения по функциям."""
+    return Job.objects.values('name').annotate(
+        total=Count('id'),
+        failed=Count('id', filter=Q(status=Job.FAILED)),
+        avg_duration=Avg('duration'),
+        max_duration=Max('duration'),
+    ).order_by('name')
@@ -0,0 +1,74 @@
+"""Кэшированный поиск объектов по уникальному полю.
+
+Значения полей хранятся на двух уровнях: в словаре процесса на
+LOCAL_TIMEOUT секунд и в общем кэше на `timeout`. Изменения объекта
+сбрасывают обе записи в процессе, который его сохранил; словари других
+процессов догонят изменения не позже чем через LOCAL_TIMEOUT.
+"""
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import Http404
+
+LOCAL_TIMEOUT: int = 5
+LOCAL_MAX_SIZE: int = 10000
+
+
+class CachedLookup:
+    def __init__(self, model, field, fields=None, timeout=60 * 60):
+        self.model = model
+        self.field = field
+        self.fields = tuple(fields or (
+            field.attname for field in model._meta.concrete_fields))
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.local = {}
+
+    def cache_key(self, value) -> str:
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'lookup:{self.model._meta.label_lower}:{self.field}:{digest}'
+
+    def get(self, value):
+        """Объект с загруженными полями `fields` или None."""
+        now = time.monotonic()
+        entry = self.local.get(value)
+        if entry is not None and entry[0] > now:
+            values = entry[1]
+        else:
+            key = self.cache_key(value)
+            values = cache.get(key)
+            if values is None:
+                values = self.model._default_manager.filter(
+                    **{self.field: value}).values_list(*self.fields).first()
+                if values is None:
+                    return None
+                cache.set(key, values, self.timeout)
+            with self.lock:
+                if len(self.local) >= LOCAL_MAX_SIZE:
+                    self.local.clear()
+                self.local[value] = (now + LOCAL_TIMEOUT, values)
+        # Каждый раз новый объект: изменения в одном запросе
+        # не попадут в другие.
+        return self.model.from_db(
+            self.model._default_manager.db, self.fields, values)
+
+    def get_or_404(self, value):
+        obj = self.get(value)
+        if obj is None:
+            raise Http404(
+                f'{self.model._meta.object_name} matching query '
+                'does not exist.')
+        return obj
+
+    def invalidate(self, *values):
+        with self.lock:
+            for value in values:
+                self.local.pop(value, None)
+        cache.delete_many([self.cache_key(value) for value in values])
+
+    def affected_by(self, update_fields) -> bool:
+        """Затрагивает ли сохранение с такими update_fields кэш."""
+        return update_fields is None or not set(update_fields).isdisjoint(
+            self.fields)
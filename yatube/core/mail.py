@@ -0,0 +1,75 @@
+"""Очередь исходящих писем.
+
+QueuedEmailBackend только сохраняет письма в таблицу QueuedEmail, поэтому
+страница сброса пароля не ждёт почтовый сервер. Команда send_queued_mail
+отправляет письма пачками через EMAIL_QUEUE_BACKEND, открывая одно
+соединение на пачку. Неотправленное письмо повторяется с удваивающейся
+паузой, после EMAIL_QUEUE_MAX_ATTEMPTS попыток помечается failed.
+"""
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .jobs import job
+from .models import QueuedEmail
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = []
+        for message in email_messages:
+            # Соединение отправителя в очереди не нужно и не сериализуется.
+            message.connection = None
+            queued.append(QueuedEmail(message=pickle.dumps(message)))
+        QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
+
+
+def retry_delay(attempts) -> timedelta:
+    return timedelta(seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (
+        attempts - 1))
+
+
+@job
+def send_queued(batch_size=None) -> tuple:
+    """Отправляет одну пачку писем. Возвращает `(отправлено, ошибок)`.
+
+    Рассчитано на один процесс отправки: параллельные процессы могут
+    отправить одно письмо дважды. По расписанию runworker не запускает
+    задачу, пока предыдущая не завершилась.
+    """
+    now = timezone.now()
+    batch = list(QueuedEmail.objects.filter(
+        failed=False, next_attempt__lte=now,
+    )[:batch_size or settings.EMAIL_QUEUE_BATCH_SIZE])
+    if not batch:
+        return 0, 0
+    sent = []
+    errors = 0
+    connection = get_connection(settings.EMAIL_QUEUE_BACKEND)
+    try:
+        connection.open()
+        for queued in batch:
+            message = pickle.loads(queued.message)
+            message.connection = connection
+            try:
+                connection.send_messages([message])
+            except Exception as error:
+                errors += 1
+                queued.attempts += 1
+                queued.last_error = repr(error)
+                queued.failed = (
+                    queued.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS)
+                queued.next_attempt = now + retry_delay(queued.attempts)
+                queued.save(update_fields=(
+                    'attempts', 'last_error', 'failed', 'next_attempt'))
+            else:
+                sent.append(queued.pk)
+    finally:
+        connection.close()
+        QueuedEmail.objects.filter(pk__in=sent).delete()
+    return len(sent), errors
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном интерпретаторе с -X importtime: в текущем
+# процессе всё уже импортировано.
+STARTUP = '''
+import json, resource, sys, time
+
+def rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+start = time.perf_counter()
+from django.conf import settings
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+import_string(settings.WSGI_APPLICATION)
+get_resolver().url_patterns
+report = {'startup': time.perf_counter() - start, 'rss': rss(),
+          'pillow': 'PIL' in sys.modules, 'modules': len(sys.modules)}
+if sys.argv[1:] == ['warm']:
+    from core.warmup import warm
+    start = time.perf_counter()
+    warm(freeze=False)
+    report.update(warm=time.perf_counter() - start, warm_rss=rss())
+print(json.dumps(report))
+'''
+
+
+def parse_importtime(output):
+    """Строки `import time: self | cumulative | name` → кортежи."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(own), int(cumulative), level))
+    return imports
+
+
+def megabytes(size) -> str:
+    return f'{size / 1024 / 1024:.1f} МБ'
+
+
+class Command(BaseCommand):
+    help = ('Запускает приложение в новом интерпретаторе и показывает, '
+            'какие импорты замедляют старт, время старта и память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15,
+                            help='Сколько строк выводить в списках.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Измерить и прогрев из core.warmup.')
+
+    def handle(self, *args, **options):
+        command = [sys.executable, '-X', 'importtime', '-c', STARTUP]
+        if options['warm']:
+            command.append('warm')
+        start = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env=dict(os.environ,
+                     DJANGO_SETTINGS_MODULE=os.environ.get(
+                         'DJANGO_SETTINGS_MODULE', 'yatube.settings')),
+        )
+        total = time.perf_counter() - start
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        report = json.loads(result.stdout.splitlines()[-1])
+        imports = parse_importtime(result.stderr)
+        top = options['top']
+
+        self.stdout.write(
+            'Холодный старт: {:.3f} с, весь процесс {:.3f} с, RSS {}, '
+            'модулей {}'.format(report['startup'], total,
+                                megabytes(report['rss']), report['modules']))
+        if options['warm']:
+            self.stdout.write('Прогрев: {:.3f} с, RSS {}'.format(
+                report['warm'], megabytes(report['warm_rss'])))
+        self.stdout.write('Pillow загружен при старте: {}'.format(
+            'да' if report['pillow'] else 'нет'))
+
+        packages = defaultdict(lambda: [0, 0])
+        for name, own, _, _ in imports:
+            package = packages[name.split('.')[0]]
+            package[0] += own
+            package[1] += 1
+        self.stdout.write('\nПакеты по собственному времени импорта:')
+        for name, (own, count) in sorted(
+                packages.items(), key=lambda item: -item[1][0])[:top]:
+            self.stdout.write(
+                f'  {name:<30} {own / 1000:8.1f} мс  {count:4} модулей')
+
+        self.stdout.write('\nИмпорты верхнего уровня с вложенными:')
+        roots = [item for item in imports if item[3] == 0]
+        for name, _, cumulative, _ in sorted(
+                roots, key=lambda item: -item[2])[:top]:
+            self.stdout.write(f'  {name:<50} {cumulative / 1000:8.1f} мс')
@@ -0,0 +1,146 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Запросы идут как от прокси, завершившего HTTPS: иначе продакшен-настройки
+# перенаправят их на https.
+HEADERS = {'X-Forwarded-Proto': 'https'}
+
+
+def run_load(url, paths, concurrency, seconds) -> dict:
+    """Нагружает сервер concurrency клиентами с keep-alive.
+
+    Возвращает число запросов, ошибок, запросов в секунду и перцентили
+    времени ответа в миллисекундах.
+    """
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + seconds
+
+    def client(offset):
+        connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80, timeout=30)
+        timings = []
+        errors = 0
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=HEADERS)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status >= 400:
+                errors += 1
+        connection.close()
+        return timings, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    timings = sorted(t for result, _ in results for t in result)
+    report = {
+        'requests': len(timings),
+        'errors': sum(errors for _, errors in results),
+        'rps': len(timings) / elapsed,
+    }
+    if len(timings) > 1:
+        percentiles = statistics.quantiles(timings, n=100)
+        report.update(p50=percentiles[49], p95=percentiles[94],
+                      p99=percentiles[98])
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((parts.hostname, parts.port), 1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Сервер {url} не запустился за {timeout} с')
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: запросы в секунду и время ответа, '
+            'в том числе для разного числа воркеров gunicorn.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Адрес уже запущенного сервера.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Страница для запросов; можно несколько.')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Одновременных клиентов.')
+        parser.add_argument('--seconds', type=float, default=10,
+                            help='Длительность каждого замера.')
+        parser.add_argument('--workers', type=int, nargs='+',
+                            help='Запускать gunicorn.conf.py с таким числом '
+                                 'воркеров и замерить каждый вариант; '
+                                 'нужны переменные окружения продакшена.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/']
+        self.stdout.write(
+            f'{"воркеров":>8} {"запросов/с":>11} {"p50 мс":>8} '
+            f'{"p95 мс":>8} {"p99 мс":>8} {"ошибок":>7}')
+        if not options['workers']:
+            report = run_load(options['url'], paths, options['concurrency'],
+                              options['seconds'])
+            return self.write_row('-', report)
+        for workers in options['workers']:
+            url = f'http://127.0.0.1:{free_port()}'
+            server = self.start_gunicorn(url, workers)
+            try:
+                wait_ready(url)
+                # Первые запросы прогревают воркеры и в замер не входят.
+                run_load(url, paths, workers, 1)
+                report = run_load(url, paths, options['concurrency'],
+                                  options['seconds'])
+            finally:
+                server.terminate()
+                server.wait()
+            self.write_row(workers, report)
+
+    def start_gunicorn(self, url, workers):
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('Для --workers нужен gunicorn')
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+             '--bind', urlsplit(url).netloc, 'yatube.wsgi'],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, GUNICORN_ACCESS_LOG=''),
+        )
+
+    def write_row(self, workers, report):
+        self.stdout.write('{:>8} {:>11.1f} {:>8.1f} {:>8.1f} {:>8.1f} '
+                          '{:>7}'.format(workers, report['rps'],
+                                         report.get('p50', 0),
+                                         report.get('p95', 0),
+                                         report.get('p99', 0),
+                                         report['errors']))
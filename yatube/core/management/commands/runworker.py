@@ -0,0 +1,87 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import worker
+from core.jobs import (cleanup, claim, job_stats, requeue_stale, run_pending,
+                       schedule_periodic)
+
+# Раз во столько секунд проверяются расписание и зависшие задачи.
+MAINTENANCE_INTERVAL = 30
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help='Размер пула; 0 — выполнять в этом процессе.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и завершиться.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать статистику задач и завершиться.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+        if options['once']:
+            schedule_periodic()
+            count = run_pending()
+            self.stdout.write(f'Выполнено задач: {count}')
+            return
+        if options['processes'] == 0:
+            return self.run_inline(options['interval'])
+        self.run_pool(options['processes'], options['interval'])
+
+    def maintain(self, last):
+        if time.monotonic() - last < MAINTENANCE_INTERVAL:
+            return last
+        close_old_connections()
+        requeue_stale()
+        schedule_periodic()
+        cleanup()
+        return time.monotonic()
+
+    def run_inline(self, interval):
+        last = 0
+        while True:
+            last = self.maintain(last)
+            if not run_pending():
+                time.sleep(interval)
+
+    def run_pool(self, processes, interval):
+        last = 0
+        running = set()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context,
+                                 initializer=worker.setup) as pool:
+            while True:
+                last = self.maintain(last)
+                for pk in claim(processes - len(running)):
+                    running.add(pool.submit(worker.execute, pk))
+                if not running:
+                    time.sleep(interval)
+                    continue
+                done, running = wait(
+                    running, timeout=interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        self.stderr.write(repr(future.exception()))
+
+    def print_stats(self):
+        for row in job_stats():
+            self.stdout.write(
+                '{name}: запусков {total}, ошибок {failed}, '
+                'среднее {avg:.3f} с, максимум {max:.3f} с'.format(
+                    name=row['name'],
+                    total=row['total'],
+                    failed=row['failed'],
+                    avg=row['avg_duration'] or 0,
+                    max=row['max_duration'] or 0,
+                )
+            )
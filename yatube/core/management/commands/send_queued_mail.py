@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди. С --loop работает как постоянный '
+        'процесс отправки; запускать не больше одного экземпляра.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='Писем за одно соединение.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Не завершаться, проверять очередь снова.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза в секундах, когда очередь пуста.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, errors = send_queued(options['batch_size'])
+            except Exception as error:
+                if not options['loop']:
+                    raise
+                # Почтовый сервер недоступен: письма остаются в очереди.
+                self.stderr.write(f'Ошибка соединения: {error!r}')
+                sent = errors = 0
+            if sent or errors:
+                self.stdout.write(f'Отправлено: {sent}, ошибок: {errors}')
+            if not options['loop']:
+                return
+            if not sent:
+                time.sleep(options['interval'])
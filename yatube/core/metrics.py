@@ -0,0 +1,202 @@
+"""Метрики в формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в своих словарях без
+блокировок и не чаще раза в METRICS_FLUSH_INTERVAL секунд записывает
+снимок в файл `METRICS_DIR/<pid>.json`. Страница /metrics складывает
+снимки всех процессов, поэтому значения общие для всех воркеров gunicorn.
+Снимок завершившегося процесса retire() прибавляет к `retired.json`
+и удаляет: счётчики не убывают, а файлов не больше, чем живых процессов.
+"""
+import fcntl
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+RETIRED = 'retired.json'
+
+HELP = {
+    'http_requests_total': 'Запросы по view, методу и статусу.',
+    'http_request_duration_seconds': 'Время обработки запроса.',
+    'db_queries_per_request': 'Запросов к базе за один HTTP-запрос.',
+    'cache_requests_total': 'Чтения кэша по пространству ключей.',
+    'thumbnail_duration_seconds': 'Время создания миниатюры.',
+    'job_duration_seconds': 'Время выполнения фоновой задачи.',
+}
+
+
+class Registry:
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.flushed_at = time.monotonic()
+
+    def inc(self, name, amount=1, /, **labels):
+        self.counters[name, tuple(sorted(labels.items()))] += amount
+
+    def observe(self, name, value, /, buckets=DURATION_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = {
+                'buckets': buckets,
+                'counts': [0] * len(buckets),
+                'sum': 0,
+                'count': 0,
+            }
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram['counts'][i] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            'counters': [
+                [name, labels, value]
+                for (name, labels), value in list(self.counters.items())
+            ],
+            'histograms': [
+                [name, labels, dict(histogram, counts=list(
+                    histogram['counts']))]
+                for (name, labels), histogram in list(self.histograms.items())
+            ],
+        }
+
+    def merge(self, snapshot):
+        for name, labels, value in snapshot['counters']:
+            self.counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = self.histograms.setdefault(key, {
+                'buckets': histogram['buckets'],
+                'counts': [0] * len(histogram['buckets']),
+                'sum': 0,
+                'count': 0,
+            })
+            for i, count in enumerate(histogram['counts']):
+                merged['counts'][i] += count
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write(f'{os.getpid()}.json', self.snapshot())
+
+    def maybe_flush(self):
+        if (time.monotonic() - self.flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+
+def write(file_name, snapshot):
+    path = os.path.join(settings.METRICS_DIR, file_name)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+
+def read(file_name):
+    try:
+        with open(os.path.join(settings.METRICS_DIR, file_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def locked(operation):
+    """Блокировка каталога: retire() не должен менять файлы, пока
+    collect() их читает, иначе снимок процесса посчитается дважды."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect() -> Registry:
+    """Сумма снимков всех процессов."""
+    total = Registry()
+    with locked(fcntl.LOCK_SH):
+        for file_name in os.listdir(settings.METRICS_DIR):
+            if file_name.endswith('.json'):
+                snapshot = read(file_name)
+                if snapshot is not None:
+                    total.merge(snapshot)
+    return total
+
+
+def retire(pid):
+    """Переносит снимок завершившегося процесса pid в `retired.json`.
+
+    Вызывается из мастера gunicorn после выхода воркера, когда снимок
+    уже не изменится, см. child_exit в gunicorn.conf.py.
+    """
+    with locked(fcntl.LOCK_EX):
+        snapshot = read(f'{pid}.json')
+        if snapshot is None:
+            return
+        retired = Registry()
+        retired.merge(read(RETIRED) or {'counters': [], 'histograms': []})
+        retired.merge(snapshot)
+        write(RETIRED, retired.snapshot())
+        os.remove(os.path.join(settings.METRICS_DIR, f'{pid}.json'))
+
+
+def format_labels(labels, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+
+
+def format_number(value) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(registry) -> str:
+    """Текстовый формат экспозиции Prometheus."""
+    series = defaultdict(list)
+    for (name, labels), value in sorted(registry.counters.items()):
+        series[name, 'counter'].append(
+            f'{name}{format_labels(labels)} {format_number(value)}')
+    for (name, labels), histogram in sorted(registry.histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            series[name, 'histogram'].append('{}_bucket{} {}'.format(
+                name, format_labels(labels, le=format_number(bound)),
+                cumulative))
+        series[name, 'histogram'].extend((
+            f'{name}_bucket{format_labels(labels, le="+Inf")} '
+            f'{histogram["count"]}',
+            f'{name}_sum{format_labels(labels)} '
+            f'{format_number(histogram["sum"])}',
+            f'{name}_count{format_labels(labels)} {histogram["count"]}',
+        ))
+    lines = []
+    for (name, kind), samples in sorted(series.items()):
+        if name in HELP:
+            lines.append(f'# HELP {name} {HELP[name]}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,28 @@
+from django.http import HttpResponse
+
+from core.hashers import PasswordHashingBusy
+
+RETRY_AFTER: int = 5
+
+
+class PasswordHashingBusyMiddleware:
+    """Отвечает 503, если view не успела взять место для хэширования.
+
+    Хэш считают не только вход и регистрация, но и смена и сброс пароля,
+    админка и любой код с check_password, поэтому ошибка обрабатывается
+    здесь, а не в отдельных view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, PasswordHashingBusy):
+            return None
+        response = HttpResponse(
+            'Сервер перегружен, повторите попытку позже.', status=503)
+        response['Retry-After'] = RETRY_AFTER
+        return response
@@ -0,0 +1,37 @@
+import time
+
+from django.db import connection
+
+from core.metrics import COUNT_BUCKETS, registry
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Считает запросы, их длительность и число запросов к базе по view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.inc('http_requests_total', view=view, method=request.method,
+                     status=response.status_code)
+        registry.observe('http_request_duration_seconds', duration, view=view)
+        registry.observe('db_queries_per_request', queries.count,
+                         buckets=COUNT_BUCKETS, view=view)
+        registry.maybe_flush()
+        return response
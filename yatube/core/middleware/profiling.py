@@ -0,0 +1,36 @@
+import hmac
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.profiling import Sampler
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос с заголовком `X-Profile: <PROFILING_TOKEN>`.
+
+    Стоит в MIDDLEWARE первым. Имя записанного файла возвращается
+    в заголовке ответа X-Profile-File.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_TOKEN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.META.get('HTTP_X_PROFILE')
+        # Байты: compare_digest не принимает строки не из ASCII.
+        if token is None or not hmac.compare_digest(
+                token.encode(), settings.PROFILING_TOKEN.encode()):
+            return self.get_response(request)
+        sampler = Sampler(request.path, thread_id=threading.get_ident())
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        response['X-Profile-File'] = os.path.basename(sampler.path)
+        return response
@@ -0,0 +1,119 @@
+import json
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+# Файлы с хэшем в имени никогда не меняются: кэшируем их на год.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Файлы без хэша (favicon.ico и т.п.) могут обновиться.
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+# Порядок предпочтения сжатых вариантов.
+ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+MANIFEST_NAME = 'staticfiles.json'
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT вместе с предварительно сжатыми вариантами."""
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.last_modified = http_date(stat.st_mtime)
+        # Слабый ETag: сжатые варианты побайтно отличаются от оригинала.
+        self.etag = 'W/"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+        self.cache_control = (
+            IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+        )
+        self.variants = [
+            (encoding, path + suffix)
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+
+    def select(self, accept_encoding):
+        accepted = {
+            part.split(';')[0].strip() for part in accept_encoding.split(',')
+        }
+        for encoding, path in self.variants:
+            if encoding in accepted:
+                return encoding, path
+        return None, self.path
+
+    def serve(self, request):
+        if request.META.get('HTTP_IF_NONE_MATCH') == self.etag:
+            response = HttpResponseNotModified()
+        else:
+            encoding, path = self.select(
+                request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=self.content_type)
+                response['Content-Length'] = os.path.getsize(path)
+            else:
+                response = FileResponse(open(path, 'rb'))
+                # FileResponse угадывает тип по имени .gz-файла.
+                response['Content-Type'] = self.content_type
+            if encoding is not None:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = self.last_modified
+        if self.variants:
+            response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = self.etag
+        response['Cache-Control'] = self.cache_control
+        return response
+
+
+def load_immutable_names(root):
+    """Имена файлов с хэшем по манифесту ManifestStaticFilesStorage."""
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest:
+            return set(json.load(manifest).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def scan_static_root(root, url):
+    immutable_names = load_immutable_names(root)
+    compressed_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(compressed_suffixes):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[url + name] = StaticFile(path, name in immutable_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Раздача статики из STATIC_ROOT без отдельного веб-сервера.
+
+    Содержимое STATIC_ROOT читается один раз при старте процесса, поэтому
+    после collectstatic воркеры нужно перезапустить. Отдаёт сжатый
+    вариант файла, если клиент его поддерживает, а файлы с хэшем
+    в имени помечает как `immutable`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.files = scan_static_root(settings.STATIC_ROOT,
+                                      settings.STATIC_URL)
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            static_file = self.files.get(request.path_info)
+            if static_file is not None:
+                return static_file.serve(request)
+        return self.get_response(request)
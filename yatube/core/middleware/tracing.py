@@ -0,0 +1,54 @@
+from django.conf import settings
+
+from core import proxies, tracing
+
+
+def view_name(request) -> str:
+    match = request.resolver_match
+    return match.view_name if match else 'unresolved'
+
+
+class TracingMiddleware:
+    """Корневой спан запроса. Стоит в MIDDLEWARE первым.
+
+    Флаг sampled из traceparent учитывается с TRACING_TRUST_SAMPLED
+    и только от TRUSTED_PROXIES, иначе клиент мог бы заставить записывать
+    трассу каждого своего запроса.
+
+    Время, не покрытое вложенным спаном view, ушло на middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.trace(
+            request.method, tracing.SERVER,
+            {'http.request.method': request.method, 'url.path': request.path},
+            traceparent=request.META.get('HTTP_TRACEPARENT'),
+            trust_sampled=(
+                settings.TRACING_TRUST_SAMPLED
+                and proxies.is_trusted(request.META.get('REMOTE_ADDR'))),
+        ) as root:
+            response = self.get_response(request)
+            if root is not None:
+                match = request.resolver_match
+                if match is not None:
+                    root.name = f'{request.method} {match.route}'
+                    root.set({'http.route': match.route})
+                root.set({'http.response.status_code': response.status_code})
+        return response
+
+
+class ViewSpanMiddleware:
+    """Спан view вместе с разбором URL. Стоит в MIDDLEWARE последним."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.span('view') as view:
+            response = self.get_response(request)
+            if view is not None:
+                view.name = view_name(request)
+        return response
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_started_to_heartbeat(apps, schema_editor):
+    Job = apps.get_model('core', 'Job')
+    Job.objects.filter(status='running').update(heartbeat=F('started'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Процесс жив на момент'),
+        ),
+        migrations.RunPython(
+            copy_started_to_heartbeat, migrations.RunPython.noop),
+    ]
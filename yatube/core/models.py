@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +11,168 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class VersionedQuerySet(models.QuerySet):
+    """QuerySet, который не даёт обновить строки мимо версии."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated', timezone.now())
+        kwargs.setdefault('version', models.F('version') + 1)
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+
+class VersionedModel(CreatedModel):
+    """Абстрактная модель. Добавляет дату изменения и номер версии.
+
+    Версия увеличивается на единицу при каждом сохранении и при
+    `QuerySet.update`, так что кэши и клиенты могут сверять её
+    одним чтением по первичному ключу.
+    """
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=1,
+        editable=False
+    )
+
+    objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.pk is None or kwargs.get('force_insert'):
+            # INSERT не принимает выражение F, а новая строка — версия 1.
+            self.version = 1
+            return super().save(*args, **kwargs)
+        if not self._state.adding:
+            # Строку загрузили из базы. Если её уже удалили, это конфликт,
+            # а не повод вставить её заново.
+            kwargs.setdefault('force_update', True)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated', 'version'}
+        version = self.version
+        # Инкремент в самой базе: параллельные сохранения не теряют версий.
+        self.version = models.F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        if isinstance(self.version, models.Expression):
+            # Без повторного чтения: если строку параллельно сохранил
+            # кто-то ещё, в памяти версия меньше, чем в базе, но не больше.
+            self.version = version + 1
+
+    def _do_insert(self, manager, using, fields, update_pk, raw):
+        if isinstance(self.version, models.Expression):
+            # Новый объект с явным pk: Django сначала пробует UPDATE,
+            # а строки не оказалось. Новая строка — версия 1.
+            self.version = 1
+        return super()._do_insert(manager, using, fields, update_pk, raw)
+
+
+class QueuedEmail(CreatedModel):
+    """Письмо в очереди на отправку, см. core.mail."""
+    message = models.BinaryField(
+        verbose_name='Письмо'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0
+    )
+    next_attempt = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        default=timezone.now,
+        db_index=True
+    )
+    failed = models.BooleanField(
+        verbose_name='Отправка прекращена',
+        default=False
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('next_attempt',)
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+
+
+class Job(CreatedModel):
+    """Фоновая задача, см. core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Завершилась ошибкой'),
+    )
+
+    name = models.CharField(
+        verbose_name='Функция',
+        max_length=200,
+        db_index=True
+    )
+    arguments = models.TextField(
+        verbose_name='Аргументы в JSON',
+        default='[[], {}]'
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запустить не раньше',
+        default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=3
+    )
+    started = models.DateTimeField(
+        verbose_name='Начало последней попытки',
+        null=True,
+        blank=True
+    )
+    heartbeat = models.DateTimeField(
+        verbose_name='Процесс жив на момент',
+        null=True,
+        blank=True
+    )
+    duration = models.FloatField(
+        verbose_name='Длительность, с',
+        null=True,
+        blank=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('run_at',)
+        indexes = [
+            models.Index(fields=('status', 'run_at')),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
@@ -0,0 +1,58 @@
+"""Постраничный вывод по ключу `(created, id)` вместо OFFSET.
+
+Курсор указывает на последний показанный объект, поэтому каждая страница
+читается одним диапазонным запросом по индексу, сколько бы объектов
+ни было до неё, и не сдвигается при появлении новых записей.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(obj) -> str:
+    return '{}:{}'.format((obj.created - EPOCH) // MICROSECOND, obj.pk)
+
+
+def decode_cursor(cursor):
+    """`(created, id)` из курсора или None, если курсор повреждён."""
+    try:
+        micros, pk = (int(part) for part in cursor.split(':'))
+        return EPOCH + micros * MICROSECOND, pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_page(queryset, position, per_page) -> KeysetPage:
+    """Страница объектов от новых к старым после позиции `(created, id)`.
+
+    Без позиции возвращает первую страницу.
+    """
+    queryset = queryset.order_by('-created', '-pk')
+    if position is not None:
+        created, pk = position
+        queryset = queryset.filter(
+            Q(created__lt=created) | Q(created=created, pk__lt=pk))
+    objects = list(queryset[:per_page + 1])
+    if len(objects) > per_page:
+        objects = objects[:per_page]
+        return KeysetPage(objects, encode_cursor(objects[-1]))
+    return KeysetPage(objects, None)
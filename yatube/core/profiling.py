@@ -0,0 +1,146 @@
+"""Сэмплирующий профилировщик для продакшена.
+
+Sampler раз в PROFILING_INTERVAL секунд снимает стеки потоков через
+sys._current_frames и по окончании записывает их в PROFILING_DIR
+в формате collapsed stacks: `кадр;кадр;кадр число`. Такой файл
+принимают flamegraph.pl, speedscope и inferno.
+
+Профилировать можно один запрос — заголовком `X-Profile` со значением
+PROFILING_TOKEN, см. ProfilingMiddleware, — или все потоки процесса
+в течение PROFILING_SIGNAL_SECONDS после сигнала PROFILING_SIGNAL
+(по умолчанию SIGPROF): `kill -PROF <pid воркера>`. Обработчик ставится
+только в воркерах gunicorn, мастеру и runserver сигнал не шлют.
+Сигналы, которыми gunicorn управляет мастером и воркерами, например USR2
+(обновление бинарника) или TTOU, не принимаются.
+Пока профилировщик не запущен, он ничего не стоит: без PROFILING_TOKEN
+middleware отключается, а обработчик сигнала только ждёт сигнала.
+
+Кадры отрисовки шаблонов подписываются именем шаблона и тега, например
+`template:posts/index.html` и `{% thumbnail %}`, чтобы время было видно
+по тегам, а не только по функциям Django. Сэмплер сам работает в потоке
+Python, поэтому снимает стеки не чаще, чем получает GIL.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.base import Node, Template, TokenType
+
+# Сигналы, которые gunicorn обрабатывает в мастере или воркерах.
+GUNICORN_SIGNALS = frozenset((
+    'SIGHUP', 'SIGQUIT', 'SIGINT', 'SIGTERM', 'SIGTTIN', 'SIGTTOU',
+    'SIGUSR1', 'SIGUSR2', 'SIGWINCH', 'SIGCHLD', 'SIGABRT',
+))
+
+NODE_RENDER = Node.render_annotated.__code__
+TEMPLATE_RENDER = Template._render.__code__
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    if code is NODE_RENDER:
+        token = getattr(frame.f_locals.get('self'), 'token', None)
+        if token is not None and token.token_type == TokenType.BLOCK:
+            return '{%% %s %%}' % token.split_contents()[0]
+    elif code is TEMPLATE_RENDER:
+        template = frame.f_locals.get('self')
+        return 'template:{}'.format(getattr(template, 'name', None)
+                                    or '<string>')
+    module = frame.f_globals.get('__name__', '?')
+    return '{}:{}'.format(module, getattr(code, 'co_qualname', code.co_name))
+
+
+def collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        stack.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки потока thread_id или всех потоков процесса.
+
+    Останавливается через duration секунд или по stop(), после чего
+    записывает файл, путь к которому остаётся в path.
+    """
+
+    def __init__(self, label, thread_id=None, duration=None):
+        super().__init__(name=f'sampler-{label}', daemon=True)
+        self.label = label
+        self.thread_id = thread_id
+        self.duration = duration
+        self.interval = settings.PROFILING_INTERVAL
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.path = None
+
+    def sample(self):
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse(frame)] += 1
+            return
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident != self.ident:
+                self.counts['{};{}'.format(
+                    names.get(ident, ident), collapse(frame))] += 1
+
+    def run(self):
+        deadline = self.duration and time.monotonic() + self.duration
+        while not self.stopped.wait(self.interval):
+            self.sample()
+            if deadline and time.monotonic() >= deadline:
+                break
+        self.path = self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self) -> str:
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        label = ''.join(
+            char if char.isalnum() or char in '-_.' else '_'
+            for char in self.label)
+        path = os.path.join(settings.PROFILING_DIR, '{}-{}-{}.folded'.format(
+            time.strftime('%Y%m%d-%H%M%S'), os.getpid(), label))
+        with open(path, 'w') as profile:
+            for stack, count in self.counts.most_common():
+                profile.write(f'{stack} {count}\n')
+        return path
+
+
+active = None
+
+
+def on_signal(signum, frame):
+    global active
+    if active is not None and active.is_alive():
+        return
+    active = Sampler('signal', duration=settings.PROFILING_SIGNAL_SECONDS)
+    active.start()
+
+
+def install_signal_handler():
+    """Включает профилирование процесса по PROFILING_SIGNAL.
+
+    Вызывается из post_worker_init в gunicorn.conf.py, в главном потоке
+    воркера: signal.signal работает только там. Не из wsgi.py: runserver
+    загружает приложение в своём потоке, а воркер gunicorn всё равно
+    сбрасывает обработчики, установленные в мастере при preload.
+    """
+    if not settings.PROFILING_SIGNAL:
+        return
+    if settings.PROFILING_SIGNAL in GUNICORN_SIGNALS:
+        raise ImproperlyConfigured(
+            f'{settings.PROFILING_SIGNAL} занят gunicorn, '
+            f'PROFILING_SIGNAL должен быть другим')
+    signal.signal(getattr(signal, settings.PROFILING_SIGNAL), on_signal)
@@ -0,0 +1,40 @@
+"""Адрес клиента за обратными прокси.
+
+За прокси REMOTE_ADDR — адрес самого прокси, а клиент записан
+в X-Forwarded-For. Заголовок может прислать и клиент, поэтому ему
+верят только от адресов из TRUSTED_PROXIES: список разбирается справа
+налево, пока адреса принадлежат доверенным прокси, и первый чужой
+адрес считается адресом клиента. TRUSTED_PROXIES содержит адреса или
+сети, например `'10.0.0.0/8'`.
+"""
+import ipaddress
+
+from django.conf import settings
+
+
+def parse_address(value):
+    try:
+        return ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+
+
+def is_trusted(address) -> bool:
+    """Адрес — один из TRUSTED_PROXIES."""
+    address = parse_address(address or '')
+    if address is None:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in settings.TRUSTED_PROXIES)
+
+
+def client_ip(request) -> str:
+    """Адрес клиента с учётом X-Forwarded-For от доверенных прокси."""
+    address = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+    while is_trusted(address) and forwarded:
+        hop = forwarded.pop()
+        if parse_address(hop) is None:
+            break
+        address = hop.strip()
+    return address
@@ -0,0 +1,158 @@
+"""Публикация событий подписчикам (комментарии в реальном времени и т.п.).
+
+Брокер выбирается настройкой PUBSUB_BROKER. LocalBroker работает внутри
+одного процесса; CacheBroker передаёт события через общий кэш и подходит
+для нескольких процессов и серверов. Другой брокер (например, на Redis)
+подключается наследованием от BaseBroker.
+"""
+import queue
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Подписка на канал. Закрывается явно или через `with`."""
+
+    def get(self, timeout):
+        """Следующее сообщение или None, если за timeout секунд их не было."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BaseBroker:
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel) -> Subscription:
+        raise NotImplementedError
+
+
+class LocalSubscription(Subscription):
+    # Медленный подписчик не должен бесконечно копить сообщения.
+    maxsize = 100
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(self.maxsize)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(BaseBroker):
+    """Брокер в памяти процесса: для одного узла и для тестов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def subscribe(self, channel):
+        subscription = LocalSubscription(self, channel)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel = self.subscriptions.get(subscription.channel, set())
+            channel.discard(subscription)
+            if not channel:
+                self.subscriptions.pop(subscription.channel, None)
+
+
+class CacheSubscription(Subscription):
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.position = broker.position(channel)
+
+    def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            message = self.broker.cache.get(
+                self.broker.message_key(self.channel, self.position + 1))
+            if message is not None:
+                self.position += 1
+                return message
+            if self.broker.position(self.channel) > self.position + 1:
+                # Сообщение вытеснено из кэша: пропускаем его.
+                self.position += 1
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.broker.poll_interval, remaining))
+
+
+class CacheBroker(BaseBroker):
+    """Брокер поверх общего кэша (memcached, redis-кэш и т.п.).
+
+    Каждый канал — счётчик и окно последних сообщений в кэше; подписчики
+    опрашивают кэш с интервалом poll_interval. Кэш должен увеличивать
+    счётчик атомарно и не менять его срок: так делают memcached, redis
+    и файловый кэш из core.cache, но не FileBasedCache Django.
+    """
+    cache_alias = 'default'
+    poll_interval = 0.5
+    message_timeout = 60
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def counter_key(self, channel):
+        return f'pubsub:{channel}:position'
+
+    def message_key(self, channel, position):
+        return f'pubsub:{channel}:{position}'
+
+    def position(self, channel):
+        return self.cache.get(self.counter_key(channel), 0)
+
+    def publish(self, channel, message):
+        key = self.counter_key(channel)
+        self.cache.add(key, 0, None)
+        position = self.cache.incr(key)
+        self.cache.set(self.message_key(channel, position), message,
+                       self.message_timeout)
+
+    def subscribe(self, channel):
+        return CacheSubscription(self, channel)
+
+
+@lru_cache(maxsize=None)
+def load_broker(path) -> BaseBroker:
+    return import_string(path)()
+
+
+def get_broker() -> BaseBroker:
+    return load_broker(settings.PUBSUB_BROKER)
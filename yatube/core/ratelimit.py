@@ -0,0 +1,87 @@
+"""Ограничение частоты запросов к пишущим страницам.
+
+Лимиты задаются в RATELIMITS как `'число/период'`, например `'10/m'`.
+Считается скользящее окно: счётчик текущего периода плюс доля счётчика
+предыдущего, пропорциональная непрошедшей части периода. Счётчики
+живут в кэше и увеличиваются incr, без запросов к базе. Лимит общий
+для процессов, только если общий кэш: с LocMemCache, как в разработке,
+каждый воркер считает свои запросы, и клиент получает лимит, умноженный
+на число воркеров. Продакшен-настройки задают общий кэш.
+
+Пользователи различаются по id: смена адреса не даёт новый лимит.
+Анонимы — по адресу клиента, см. core.proxies.client_ip.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .proxies import client_ip
+
+PERIODS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+}
+
+
+def parse_rate(rate):
+    """`'10/m'` → `(10, 60)`."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def client_key(request) -> str:
+    """Пользователь, а для анонимов — IP-адрес."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def incr(key, timeout) -> int:
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ истёк между add и incr.
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def hit(scope, key, limit, period):
+    """Учитывает запрос. Возвращает None или секунды до следующей попытки."""
+    now = time.time()
+    window, offset = divmod(now, period)
+    prefix = f'ratelimit:{scope}:{key}'
+    current = incr(f'{prefix}:{int(window)}', period * 2)
+    previous = cache.get(f'{prefix}:{int(window) - 1}', 0)
+    if previous * (1 - offset / period) + current <= limit:
+        return None
+    return math.ceil(period - offset)
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Декоратор view с лимитом RATELIMITS[scope].
+
+    Лимит проверяется только для methods; None — для всех запросов.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            rate = settings.RATELIMITS.get(scope)
+            if rate and (methods is None or request.method in methods):
+                limit, period = parse_rate(rate)
+                retry_after = hit(scope, client_key(request), limit, period)
+                if retry_after is not None:
+                    response = HttpResponse(
+                        'Слишком много запросов, повторите попытку позже.',
+                        status=429)
+                    response['Retry-After'] = retry_after
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
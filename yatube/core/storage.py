@@ -0,0 +1,64 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Сжимаем только текстовые форматы: картинки уже сжаты и только
+# потеряют в размере заголовков.
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.map', '.ico',
+)
+# Сжатый вариант сохраняем, только если он заметно меньше оригинала.
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def compress_gzip(content: bytes) -> bytes:
+    # mtime=0 делает результат детерминированным между сборками.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def compress_brotli(content: bytes) -> bytes:
+    return brotli.compress(content)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище статики с хэшами в именах файлов.
+
+    Помимо манифеста при collectstatic рядом с каждым текстовым файлом
+    кладёт предварительно сжатые варианты `.gz` и, если установлен
+    пакет brotli, `.br`.
+    """
+    compressors = (
+        ('.gz', compress_gzip),
+        ('.br', compress_brotli if brotli is not None else None),
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths)
+        names.update(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        for suffix, compressor in self.compressors:
+            if compressor is None:
+                continue
+            compressed = compressor(content)
+            if len(compressed) > len(content) * MIN_COMPRESSION_RATIO:
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
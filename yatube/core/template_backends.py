@@ -0,0 +1,27 @@
+"""Шаблонный бэкенд Django, который попадает в трассировку.
+
+Спаном становится отрисовка шаблона, полученного через бэкенд: ответы
+render() и render_to_string(). Шаблоны из extends и include входят в спан
+шаблона, который их подключил.
+"""
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import tracing
+
+
+class TracedTemplate(Template):
+    def render(self, context=None, request=None):
+        with tracing.span('template.render', attributes={
+            'template.name': self.origin.template_name or '<string>',
+        }):
+            return super().render(context, request)
+
+
+class TracingDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TracedTemplate(super().from_string(template_code).template,
+                              self)
+
+    def get_template(self, template_name):
+        return TracedTemplate(super().get_template(template_name).template,
+                              self)
@@ -1,5 +1,6 @@
 from django import template
 
+from core.pagination import encode_cursor
 
 register = template.Library()
 
@@ -7,3 +8,14 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def feed_cursor(page):
+    """Курсор самого нового поста страницы, см. new_posts_response.
+
+    Для пустой ленты новыми будут все посты.
+    """
+    if not page:
+        return '0:0'
+    return encode_cursor(page[0])
@@ -0,0 +1,801 @@
+import gzip
+import importlib
+import json
+import os
+import shutil
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.hashers import make_password
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import OperationalError, connection
+from django.test import (Client, LiveServerTestCase, RequestFactory,
+                         SimpleTestCase, TestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import InstrumentedFileBasedCache
+from core.counters import CounterBuffer
+from core.jobs import (claim, job, job_stats, requeue_stale, run_pending,
+                       schedule_periodic)
+from core.mail import send_queued
+from core.management.commands.loadtest import run_load
+from core.metrics import collect, registry, retire
+from core.middleware.static import StaticFilesMiddleware
+from core.models import Job, QueuedEmail
+from core.profiling import Sampler, install_signal_handler
+from core.pubsub import CacheBroker, LocalBroker
+from core.warmup import warm
+from core.ratelimit import client_key, hit
+
+TEMP_STATIC_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+TEMP_TRACES_DIR = tempfile.mkdtemp()
+TRACING_FILE = os.path.join(TEMP_TRACES_DIR, 'traces.jsonl')
+TEMP_PROFILING_DIR = tempfile.mkdtemp()
+CSS = b'body { color: red; }\n' * 100
+
+
+@override_settings(
+    STATICFILES_DIRS=(TEMP_STATIC_DIR,),
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+    STATIC_SERVE=True,
+)
+class StaticPipelineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_STATIC_DIR, 'css'))
+        with open(os.path.join(TEMP_STATIC_DIR, 'css', 'site.css'),
+                  'wb') as css:
+            css.write(CSS)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed_name = staticfiles_storage.stored_name('css/site.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_DIR, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = StaticFilesMiddleware(lambda request: None)
+
+    def test_collectstatic_creates_hashed_and_compressed_files(self):
+        """collectstatic кладёт файл с хэшем и его gzip-вариант."""
+        self.assertNotEqual(self.hashed_name, 'css/site.css')
+        path = os.path.join(TEMP_STATIC_ROOT, self.hashed_name + '.gz')
+        with open(path, 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), CSS)
+
+    def test_middleware_serves_compressed_immutable_file(self):
+        """Файл с хэшем отдаётся сжатым и кэшируется навсегда."""
+        request = self.factory.get(
+            settings.STATIC_URL + self.hashed_name,
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+        response = self.middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = b''.join(response.streaming_content)
+        response.close()
+        self.assertEqual(gzip.decompress(body), CSS)
+
+    def test_middleware_respects_etag_and_plain_clients(self):
+        """Без Accept-Encoding отдаётся оригинал, по ETag — 304."""
+        url = settings.STATIC_URL + 'css/site.css'
+        response = self.middleware(self.factory.get(url))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+        response.close()
+        response = self.middleware(
+            self.factory.get(url, HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(response.status_code, 304)
+
+    def test_middleware_skips_unknown_paths(self):
+        """Остальные запросы проходят дальше по цепочке."""
+        request = self.factory.get(settings.STATIC_URL + 'missing.css')
+        self.assertIsNone(self.middleware(request))
+
+
+class BrokerTests(SimpleTestCase):
+    def check_broker(self, broker):
+        with broker.subscribe('channel') as subscription:
+            broker.publish('channel', {'id': 1})
+            broker.publish('other', {'id': 2})
+            self.assertEqual(subscription.get(timeout=1), {'id': 1})
+            self.assertIsNone(subscription.get(timeout=0.01))
+
+    def test_local_broker(self):
+        """LocalBroker доставляет сообщения подписчикам канала."""
+        broker = LocalBroker()
+        self.check_broker(broker)
+        self.assertEqual(broker.subscriptions, {})
+
+    def test_cache_broker(self):
+        """CacheBroker доставляет сообщения через кэш."""
+        broker = CacheBroker()
+        broker.poll_interval = 0.005
+        self.check_broker(broker)
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=0.01, COUNTER_FLUSH_THRESHOLD=1000)
+class CounterTimerTests(SimpleTestCase):
+    def test_timer_flushes_without_requests(self):
+        """Поток записывает накопленное, даже если запросов больше нет."""
+        buffer = CounterBuffer()
+        written = threading.Event()
+        with mock.patch('core.counters.write_counts',
+                        side_effect=lambda *args: written.set()):
+            buffer.incr(Job, 1)
+            buffer.start_timer()
+            buffer.start_timer()
+            self.assertTrue(written.wait(1))
+        self.assertEqual(buffer.get_pending(Job, 1), 0)
+        self.assertEqual(sum(
+            thread.name == 'counter-flush'
+            for thread in threading.enumerate()), 1)
+
+
+class CounterBufferTests(TestCase):
+    @override_settings(COUNTER_FLUSH_THRESHOLD=2)
+    def test_failed_write_keeps_counts(self):
+        """Ошибка базы не роняет запрос и не теряет пачку."""
+        buffer = CounterBuffer()
+        with mock.patch('core.counters.write_counts',
+                        side_effect=OperationalError('database is locked')):
+            buffer.incr(Job, 1)
+            buffer.incr(Job, 1)
+        self.assertEqual(buffer.get_pending(Job, 1), 2)
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(
+            username='HasNoName', password='old-password')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        return [query for query in queries.captured_queries
+                if 'FROM "auth_user"' in query['sql']]
+
+    def test_session_user_is_cached(self):
+        """Пользователь сессии читается из базы только первый раз."""
+        self.assertTrue(self.user_queries())
+        self.assertEqual(self.user_queries(), [])
+
+    def test_password_change_drops_cached_user(self):
+        """После смены пароля старая сессия перестаёт действовать."""
+        self.user_queries()
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['core.hashers.PBKDF2PasswordHasher'],
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+class PasswordHashingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='HasNoName')
+
+    def setUp(self):
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password('password', hasher='pbkdf2_sha256'))
+
+    def login(self):
+        return Client().post(reverse('users:login'), {
+            'username': 'HasNoName', 'password': 'password'})
+
+    def test_login_rehashes_password_with_current_cost(self):
+        """При входе хэш пересчитывается с настроенной стоимостью."""
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(PASSWORD_HASHING_WAIT=0.01)
+    def test_login_returns_503_when_hashing_is_busy(self):
+        """Если все места для хэширования заняты, вход отвечает 503."""
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch('core.hashers.slots', slots):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(PASSWORD_HASHING_WAIT=0.01)
+    def test_any_view_returns_503_when_hashing_is_busy(self):
+        """503 отдаёт и смена пароля, а не только вход и регистрация."""
+        client = Client()
+        client.force_login(get_user_model().objects.get(pk=self.user.pk))
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch('core.hashers.slots', slots):
+            response = client.post(reverse('users:password_change_form'), {
+                'old_password': 'password',
+                'new_password1': 'Nov0e-parol',
+                'new_password2': 'Nov0e-parol',
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='HasNoName')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_sliding_window_counts_previous_period(self):
+        """Запросы прошлого периода учитываются пропорционально."""
+        with mock.patch('core.ratelimit.time.time', return_value=90):
+            self.assertIsNone(hit('scope', 'key', 2, 60))
+            self.assertIsNone(hit('scope', 'key', 2, 60))
+            self.assertEqual(hit('scope', 'key', 2, 60), 30)
+        with mock.patch('core.ratelimit.time.time', return_value=135):
+            # 3 * (1 - 15 / 60) + 1 > 2
+            self.assertEqual(hit('scope', 'key', 2, 60), 45)
+        with mock.patch('core.ratelimit.time.time', return_value=175):
+            self.assertIsNone(hit('other', 'key', 2, 60))
+
+    @override_settings(RATELIMITS={'post_create': '2/m'})
+    def test_write_view_returns_429_without_queries(self):
+        """Сверх лимита страница отвечает 429 и не обращается к базе."""
+        url = reverse('posts:post_create')
+        self.client.get(url)
+        for _ in range(2):
+            self.client.post(url, {'text': 'Текст'})
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1', '10.0.0.0/8'])
+    def test_client_address_behind_trusted_proxies(self):
+        """X-Forwarded-For учитывается только от доверенных прокси."""
+        cases = (
+            ('127.0.0.1', '198.51.100.7, 10.0.0.2', 'ip:198.51.100.7'),
+            ('127.0.0.1', '6.6.6.6, 198.51.100.7', 'ip:198.51.100.7'),
+            ('203.0.113.1', '198.51.100.7', 'ip:203.0.113.1'),
+            ('127.0.0.1', 'unknown', 'ip:127.0.0.1'),
+        )
+        for remote_addr, forwarded, key in cases:
+            with self.subTest(forwarded=forwarded):
+                request = RequestFactory().get(
+                    '/', REMOTE_ADDR=remote_addr,
+                    HTTP_X_FORWARDED_FOR=forwarded)
+                request.user = AnonymousUser()
+                self.assertEqual(client_key(request), key)
+        request.user = self.user
+        self.assertEqual(client_key(request), f'user:{self.user.pk}')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: запоминает письма, отклоняет reject@."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        recipients, data = [], None
+        for line in self.rfile:
+            line = line.decode()
+            if data is not None:
+                if line == '.\r\n':
+                    self.server.messages.append((recipients, ''.join(data)))
+                    recipients, data = [], None
+                    self.reply('250 OK')
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command == 'RCPT' and 'reject@' in line:
+                self.reply('550 No such user')
+            elif command == 'RCPT':
+                recipients.append(line.split(':', 1)[1].strip())
+                self.reply('250 OK')
+            elif command == 'DATA':
+                data = []
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+@override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend')
+class EmailQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), SMTPHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        get_user_model().objects.create_user(
+            username='HasNoName', email='user@example.com',
+            password='password')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.messages = []
+        self.server.connections = 0
+        self.smtp = self.settings(
+            EMAIL_QUEUE_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.server_address[1],
+        )
+
+    def test_password_reset_is_queued_and_sent_in_batch(self):
+        """Сброс пароля не ждёт почту, письма уходят одним соединением."""
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        mail.send_mail('Тема', 'Текст', 'from@example.com',
+                       ['other@example.com'])
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+        self.assertEqual(self.server.connections, 0)
+        with self.smtp:
+            self.assertEqual(send_queued(), (2, 0))
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            [recipients for recipients, data in self.server.messages],
+            [['<user@example.com>'], ['<other@example.com>']],
+        )
+        self.assertFalse(QueuedEmail.objects.exists())
+
+    def test_failed_message_is_retried_later(self):
+        """Отклонённое письмо остаётся в очереди с паузой до повтора."""
+        mail.send_mail('Тема', 'Текст', 'from@example.com',
+                       ['reject@example.com'])
+        with self.smtp, self.settings(EMAIL_QUEUE_MAX_ATTEMPTS=2):
+            self.assertEqual(send_queued(), (0, 1))
+            self.assertEqual(send_queued(), (0, 0))
+            QueuedEmail.objects.update(next_attempt=timezone.now())
+            self.assertEqual(send_queued(), (0, 1))
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.attempts, 2)
+        self.assertTrue(queued.failed)
+        self.assertIn('550', queued.last_error)
+
+
+calls = []
+
+
+@job(max_attempts=2)
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError(value)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_runs_job_with_arguments(self):
+        """Задача ставится одним вызовом и выполняется воркером."""
+        record.delay('a')
+        record.schedule(timezone.now() + timedelta(hours=1), 'b')
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        done = Job.objects.get(status=Job.DONE)
+        self.assertEqual(done.name, 'core.tests.record')
+        self.assertIsNotNone(done.duration)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача повторяется позже, затем помечается failed."""
+        task = record.delay('x', fail=True)
+        run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Job.QUEUED)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('RuntimeError', task.last_error)
+        Job.objects.update(run_at=timezone.now())
+        run_pending()
+        task.refresh_from_db()
+        self.assertEqual(task.status, Job.FAILED)
+        self.assertEqual(calls, ['x', 'x'])
+        stats = job_stats().get(name='core.tests.record')
+        self.assertEqual((stats['total'], stats['failed']), (1, 1))
+
+    def test_only_jobs_without_heartbeat_are_requeued(self):
+        """Долгая задача живого процесса не возвращается в очередь."""
+        alive, dead = record.delay('alive'), record.delay('dead')
+        claim(2)
+        long_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.update(started=long_ago)
+        Job.objects.filter(pk=dead.pk).update(heartbeat=long_ago)
+        requeue_stale()
+        alive.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual(alive.status, Job.RUNNING)
+        self.assertEqual(dead.status, Job.QUEUED)
+
+    @override_settings(JOB_SCHEDULE={'core.tests.record': 60})
+    def test_periodic_job_is_enqueued_once_per_interval(self):
+        """Периодическая задача не ставится, пока не прошёл интервал."""
+        schedule_periodic()
+        schedule_periodic()
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.update(arguments='[["tick"], {}]')
+        run_pending()
+        schedule_periodic()
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.update(run_at=timezone.now() - timedelta(
+            minutes=2))
+        schedule_periodic()
+        self.assertEqual(Job.objects.count(), 2)
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_request_is_counted_by_view(self):
+        """Запрос попадает в /metrics с именем view и числом запросов к БД."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="posts:index"}', text)
+        self.assertIn(
+            'db_queries_per_request_count{view="posts:index"}', text)
+
+    def test_snapshots_of_all_processes_are_summed(self):
+        """Счётчики других процессов складываются с текущим."""
+        labels = [['method', 'GET'], ['status', 200], ['view', 'x']]
+        registry.inc('http_requests_total', 2, **dict(labels))
+        registry.flush()
+        with open(os.path.join(TEMP_METRICS_DIR, '0.json'), 'w') as other:
+            json.dump({
+                'counters': [['http_requests_total', labels, 3]],
+                'histograms': [],
+            }, other)
+        key = ('http_requests_total', tuple(map(tuple, labels)))
+        self.assertEqual(collect().counters[key], registry.counters[key] + 3)
+
+    def test_retired_process_keeps_its_counters(self):
+        """Снимок завершившегося процесса переносится в общий файл."""
+        labels = [['view', 'retired']]
+        key = ('http_requests_total', (('view', 'retired'),))
+        for pid, value in ((1, 2), (2, 5)):
+            with open(os.path.join(TEMP_METRICS_DIR, f'{pid}.json'),
+                      'w') as snapshot:
+                json.dump({
+                    'counters': [['http_requests_total', labels, value]],
+                    'histograms': [],
+                }, snapshot)
+            retire(pid)
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_METRICS_DIR, '1.json')))
+        self.assertEqual(collect().counters[key], 7)
+
+    def test_fragment_cache_hits_and_misses(self):
+        """Чтения кэша фрагментов считаются по имени фрагмента."""
+        def count(result):
+            return registry.counters[
+                'cache_requests_total',
+                (('namespace', 'fragment:index'), ('result', result)),
+            ]
+
+        hits, misses = count('hit'), count('miss')
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(count('miss'), misses + 1)
+        self.assertEqual(count('hit'), hits + 1)
+
+    def test_metrics_require_token(self):
+        for header in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+                       {'HTTP_AUTHORIZATION': 'Bearer ключ'}):
+            with self.subTest(header=header):
+                response = self.client.get(reverse('metrics'), **header)
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(TRACING_FILE=TRACING_FILE, TRACING_SAMPLE_RATE=1)
+class TracingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_TRACES_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        if os.path.exists(TRACING_FILE):
+            os.remove(TRACING_FILE)
+        self.client.force_login(self.user)
+
+    def spans(self):
+        with open(TRACING_FILE) as traces:
+            lines = traces.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        data = json.loads(lines[0])['resourceSpans'][0]
+        return data['scopeSpans'][0]['spans']
+
+    def test_request_spans_form_one_tree(self):
+        """Запрос даёт дерево спанов: view, запросы к базе, кэш, шаблон."""
+        self.client.get(reverse('posts:follow_index'))
+        spans = self.spans()
+        by_id = {span['spanId']: span for span in spans}
+        names = {span['name'] for span in spans}
+        self.assertTrue({'GET follow/', 'posts:follow_index', 'db.query',
+                         'cache.get', 'template.render'} <= names)
+        self.assertEqual(len({span['traceId'] for span in spans}), 1)
+        roots = [span for span in spans if 'parentSpanId' not in span]
+        self.assertEqual([root['name'] for root in roots], ['GET follow/'])
+        for span in spans:
+            if span is not roots[0]:
+                self.assertIn(span['parentSpanId'], by_id)
+
+    @override_settings(TRACING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_written(self):
+        self.client.get(reverse('posts:follow_index'))
+        self.assertFalse(os.path.exists(TRACING_FILE))
+
+    @override_settings(TRACING_SAMPLE_RATE=0, TRACING_TRUST_SAMPLED=True,
+                       TRUSTED_PROXIES=['127.0.0.1'])
+    def test_traceparent_continues_caller_trace(self):
+        """Трасса с флагом sampled от доверенного прокси записывается."""
+        trace_id = '4bf92f3577b34da6a3ce929d0e0e4736'
+        parent_id = '00f067aa0ba902b7'
+        self.client.get(
+            reverse('posts:follow_index'),
+            HTTP_TRACEPARENT=f'00-{trace_id}-{parent_id}-01')
+        root = next(span for span in self.spans()
+                    if span['name'] == 'GET follow/')
+        self.assertEqual(root['traceId'], trace_id)
+        self.assertEqual(root['parentSpanId'], parent_id)
+
+    @override_settings(TRACING_SAMPLE_RATE=0, TRACING_TRUST_SAMPLED=True)
+    def test_sampled_flag_from_untrusted_client_is_ignored(self):
+        self.client.get(
+            reverse('posts:follow_index'),
+            HTTP_TRACEPARENT='00-4bf92f3577b34da6a3ce929d0e0e4736-'
+                             '00f067aa0ba902b7-01')
+        self.assertFalse(os.path.exists(TRACING_FILE))
+
+    @override_settings(TRACING_FILE_MAX_BYTES=1)
+    def test_trace_file_is_rotated(self):
+        """Переполненный файл трасс уступает место новому."""
+        self.client.get(reverse('posts:follow_index'))
+        self.assertFalse(os.path.exists(TRACING_FILE))
+        with open(TRACING_FILE + '.1') as rotated:
+            self.assertEqual(len(rotated.read().splitlines()), 1)
+        os.remove(TRACING_FILE + '.1')
+
+
+@override_settings(PROFILING_DIR=TEMP_PROFILING_DIR, PROFILING_INTERVAL=0.001,
+                   PROFILING_TOKEN='secret')
+class ProfilingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILING_DIR, ignore_errors=True)
+
+    def read(self, path):
+        with open(path) as profile:
+            return profile.read().splitlines()
+
+    @override_settings(PROFILING_SIGNAL='SIGUSR2')
+    def test_gunicorn_signals_are_refused(self):
+        """USR2 обновляет бинарник gunicorn и профилированию не отдаётся."""
+        with self.assertRaises(ImproperlyConfigured):
+            install_signal_handler()
+
+    def test_wsgi_loads_outside_main_thread(self):
+        """runserver загружает wsgi.py не в главном потоке."""
+        errors = []
+
+        def load():
+            try:
+                importlib.reload(importlib.import_module('yatube.wsgi'))
+            except Exception as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=load)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, [])
+
+    def test_time_is_attributed_to_template_tags(self):
+        """Стеки подписаны шаблоном и тегом, внутри которого шло время."""
+        template = Template(
+            '{% load cache %}{% cache 60 slow %}{{ wait }}{% endcache %}')
+        sampler = Sampler('test', thread_id=threading.get_ident())
+        sampler.start()
+        template.render(Context({'wait': lambda: time.sleep(0.1)}))
+        sampler.stop()
+        lines = self.read(sampler.path)
+        self.assertTrue(lines)
+        self.assertTrue(any(
+            'template:<string>;' in line and '{% cache %}' in line
+            for line in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+
+    def test_request_with_token_is_profiled(self):
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='secret')
+        path = os.path.join(TEMP_PROFILING_DIR, response['X-Profile-File'])
+        self.assertTrue(os.path.exists(path))
+
+    def test_request_without_token_is_not_profiled(self):
+        for token in ('wrong', 'ключ'):
+            with self.subTest(token=token):
+                response = self.client.get(
+                    reverse('posts:index'), HTTP_X_PROFILE=token)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('X-Profile-File'))
+
+
+class StartupTests(SimpleTestCase):
+    def test_warm_prepares_urls_models_and_templates(self):
+        report = warm(freeze=False)
+        for step in ('urls', 'models', 'templates'):
+            self.assertGreater(report[step][0], 0, step)
+
+    def test_audit_reports_startup_without_pillow(self):
+        """Pillow не импортируется при старте, только при первой миниатюре."""
+        out = StringIO()
+        call_command('audit_imports', top=5, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Холодный старт', output)
+        self.assertIn('Pillow загружен при старте: нет', output)
+        self.assertIn('django', output)
+
+
+class ProductionSettingsTests(SimpleTestCase):
+    def load(self, **env):
+        """Загружает настройки продакшена в новом интерпретаторе."""
+        env = dict(
+            {key: value for key, value in os.environ.items()
+             if not key.startswith('DJANGO_')},
+            DJANGO_SETTINGS_MODULE='yatube.settings_production', **env)
+        return subprocess.run(
+            [sys.executable, '-c',
+             'from django.conf import settings; print(settings.DEBUG, '
+             'settings.TEMPLATES[0]["OPTIONS"]["loaders"][0][0], '
+             'settings.CACHES["default"]["BACKEND"], settings.PUBSUB_BROKER, '
+             'settings.ALLOWED_HOSTS)'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+
+    def test_debug_is_off_and_templates_are_cached(self):
+        result = self.load(DJANGO_SECRET_KEY='x' * 50,
+                           DJANGO_ALLOWED_HOSTS='a.example, b.example',
+                           DJANGO_DEBUG='true')
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(maxsplit=4), [
+            'False', 'django.template.loaders.cached.Loader',
+            'core.cache.InstrumentedFileBasedCache', 'core.pubsub.CacheBroker',
+            "['a.example', 'b.example']\n"])
+
+    def test_secret_key_is_required(self):
+        result = self.load(DJANGO_ALLOWED_HOSTS='yatube.example')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('DJANGO_SECRET_KEY', result.stderr)
+
+    def test_process_local_cache_is_refused(self):
+        """Пользователь сессии не кэшируется в памяти одного воркера."""
+        result = self.load(
+            DJANGO_SECRET_KEY='x' * 50, DJANGO_ALLOWED_HOSTS='a.example',
+            DJANGO_CACHE_BACKEND='core.cache.InstrumentedLocMemCache')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('CachedModelBackend', result.stderr)
+
+    def test_cache_without_atomic_incr_is_refused_for_pubsub(self):
+        """Позиции CacheBroker не выдаются двум воркерам сразу."""
+        result = self.load(
+            DJANGO_SECRET_KEY='x' * 50, DJANGO_ALLOWED_HOSTS='a.example',
+            DJANGO_CACHE_BACKEND=(
+                'django.core.cache.backends.filebased.FileBasedCache'))
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('CacheBroker', result.stderr)
+
+
+class FileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_concurrent_incr_loses_nothing(self):
+        cache = InstrumentedFileBasedCache(self.directory, {})
+        cache.set('counter', 0)
+
+        def work():
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.get('counter'), 200)
+
+    def test_incr_keeps_the_expiry(self):
+        """Счётчик без срока не получает TIMEOUT по умолчанию после incr."""
+        cache = InstrumentedFileBasedCache(self.directory, {})
+        cache.add('counter', 0, None)
+        cache.set('temporary', 0, 60)
+        self.assertEqual(cache.incr('counter'), 1)
+        cache.incr('temporary')
+        with mock.patch('time.time', return_value=time.time() + 3600):
+            self.assertEqual(cache.get('counter'), 1)
+            self.assertIsNone(cache.get('temporary'))
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_run_load_reports_throughput(self):
+        report = run_load(self.live_server_url, ['/', '/about/author/'],
+                          concurrency=2, seconds=0.3)
+        self.assertGreater(report['requests'], 0)
+        self.assertEqual(report['errors'], 0)
+        self.assertGreater(report['rps'], 0)
@@ -0,0 +1,28 @@
+import time
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from . import tracing
+from .metrics import registry
+
+
+class InstrumentedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который измеряет создание миниатюр и трассирует их."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with tracing.span('thumbnail', attributes={
+            'thumbnail.geometry': geometry_string,
+        }):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        start = time.perf_counter()
+        try:
+            with tracing.span('thumbnail.create'):
+                return super()._create_thumbnail(
+                    source_image, geometry_string, options, thumbnail)
+        finally:
+            registry.observe(
+                'thumbnail_duration_seconds', time.perf_counter() - start,
+                geometry=geometry_string)
@@ -0,0 +1,204 @@
+"""Трассировка запросов и фоновых задач спанами OpenTelemetry.
+
+trace() открывает корневой спан, span() — вложенный. Записывать ли
+трассу, решается один раз в её начале: с вероятностью
+TRACING_SAMPLE_RATE или, если вызывающему доверяют, по флагу из
+заголовка traceparent. Флаг может поставить любой клиент, поэтому без
+доверия из traceparent берутся только идентификаторы трассы. Если
+трасса не записывается, span() сразу возвращает пустой контекст,
+поэтому трассировку можно не выключать в продакшене.
+
+Внутри записываемой трассы спаном становится каждый запрос к базе.
+Завершённая трасса дописывается одной строкой OTLP/JSON в TRACING_FILE;
+такой файл читает приёмник otlpjsonfile из OpenTelemetry Collector.
+Файл больше TRACING_FILE_MAX_BYTES переименовывается в TRACING_FILE.1,
+прежний TRACING_FILE.1 при этом пропадает.
+"""
+import json
+import os
+import random
+import re
+import time
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+STATUS_ERROR = 2
+
+MAX_STATEMENT_LENGTH: int = 2000
+
+TRACEPARENT_RE = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+NOT_RECORDING = nullcontext()
+
+current = ContextVar('current_span', default=None)
+
+
+def new_id(bits) -> str:
+    return '{:0{}x}'.format(random.getrandbits(bits), bits // 4)
+
+
+def parse_traceparent(header):
+    """`(trace_id, parent_id, sampled)` из заголовка W3C или None."""
+    match = TRACEPARENT_RE.match(header.strip().lower())
+    if match is None or match[1] == '0' * 32 or match[2] == '0' * 16:
+        return None
+    return match[1], match[2], bool(int(match[3], 16) & 1)
+
+
+def encode_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def encode_attributes(attributes) -> list:
+    return [
+        {'key': key, 'value': encode_value(value)}
+        for key, value in attributes.items()
+    ]
+
+
+class Span:
+    def __init__(self, trace_id, parent_id, name, kind, attributes, spans):
+        self.trace_id = trace_id
+        self.span_id = new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        # Общий список завершённых спанов трассы.
+        self.spans = spans
+        self.start = self.end = None
+
+    def set(self, attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.time_ns()
+        self.token = current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time_ns()
+        current.reset(self.token)
+        if exc is not None:
+            self.error = exc
+        self.spans.append(self)
+        return False
+
+    def as_otlp(self) -> dict:
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': encode_attributes(self.attributes),
+        }
+        if self.parent_id:
+            data['parentSpanId'] = self.parent_id
+        if self.error is not None:
+            data['status'] = {
+                'code': STATUS_ERROR,
+                'message': f'{type(self.error).__name__}: {self.error}',
+            }
+        return data
+
+
+class RootSpan(Span):
+    """Корневой спан: следит за запросами к базе и выгружает трассу."""
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(trace_query))
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self.stack.close()
+        export(self.spans)
+        return False
+
+
+def trace(name, kind=INTERNAL, attributes=None, traceparent=None,
+          trust_sampled=False):
+    """Корневой спан; внутри уже идущей трассы — обычный вложенный.
+
+    Флаг sampled из traceparent учитывается только с trust_sampled.
+    """
+    if current.get() is not None:
+        return span(name, kind, attributes)
+    trace_id = parent_id = None
+    sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    parent = traceparent and parse_traceparent(traceparent)
+    if parent:
+        trace_id, parent_id, parent_sampled = parent
+        if trust_sampled:
+            sampled = parent_sampled
+    if not sampled:
+        return NOT_RECORDING
+    return RootSpan(
+        trace_id or new_id(128), parent_id, name, kind, attributes, [])
+
+
+def span(name, kind=INTERNAL, attributes=None):
+    parent = current.get()
+    if parent is None:
+        return NOT_RECORDING
+    return Span(parent.trace_id, parent.span_id, name, kind, attributes,
+                parent.spans)
+
+
+def trace_query(execute, sql, params, many, context):
+    with span('db.query', CLIENT, {
+        'db.system': context['connection'].vendor,
+        'db.statement': sql[:MAX_STATEMENT_LENGTH],
+    }):
+        return execute(sql, params, many, context)
+
+
+def export(spans):
+    """Дописывает трассу строкой OTLP/JSON.
+
+    Строка пишется одним вызовом write в файл с O_APPEND, поэтому строки
+    разных процессов не перемешиваются.
+    """
+    line = json.dumps({'resourceSpans': [{
+        'resource': {'attributes': encode_attributes({
+            'service.name': settings.TRACING_SERVICE_NAME,
+            'process.pid': os.getpid(),
+        })},
+        'scopeSpans': [{
+            'scope': {'name': __name__},
+            'spans': [item.as_otlp() for item in spans],
+        }],
+    }]}, ensure_ascii=False) + '\n'
+    path = settings.TRACING_FILE
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+        written = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if written.st_size > settings.TRACING_FILE_MAX_BYTES:
+        try:
+            # Файл мог уже переименовать другой процесс.
+            if os.stat(path).st_ino == written.st_ino:
+                os.replace(path, path + '.1')
+        except FileNotFoundError:
+            pass
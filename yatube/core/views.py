@@ -1,7 +1,12 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import collect, registry, render as render_metrics
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -16,3 +21,22 @@ def csrf_failure(request, reason=''):
 
 def internal_server_failure(request, reason=''):
     return render(request, 'core/500.html')
+
+
+def metrics(request):
+    """Метрики всех процессов в текстовом формате Prometheus.
+
+    Доступны с заголовком `Authorization: Bearer <METRICS_TOKEN>`:
+    за прокси адрес клиента у всех запросов один и ничего не говорит.
+    """
+    # compare_digest сравнивает строки только из ASCII, а заголовок
+    # может прийти любым.
+    token = request.META.get('HTTP_AUTHORIZATION', '').encode()
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(
+            token, f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        raise Http404
+    registry.flush()
+    return HttpResponse(
+        render_metrics(collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,76 @@
+"""Прогрев процесса перед первым запросом.
+
+warm() заранее делает то, что иначе досталось бы первым запросам
+каждого воркера: разбирает URL-шаблоны, компилирует шаблоны в кэш
+загрузчика, строит метаданные моделей и импортирует движок миниатюр
+с Pillow. Если приложение загружено в мастере gunicorn (preload_app),
+воркеры получают всё это после fork общими страницами памяти.
+gc.freeze() убирает прогретые объекты из-под сборщика мусора, иначе он
+при обходе записывал бы в их заголовки и копировал страницы в каждый
+воркер.
+"""
+import gc
+import os
+import time
+
+from django.apps import apps
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def warm_urls() -> int:
+    resolver = get_resolver()
+    # reverse_dict заполняет и словари всех вложенных include.
+    return len(resolver.reverse_dict)
+
+
+def warm_models() -> int:
+    models = apps.get_models(include_auto_created=True)
+    for model in models:
+        model._meta.get_fields()
+    return len(models)
+
+
+def warm_templates() -> int:
+    """Компилирует шаблоны проекта из DIRS всех шаблонных движков.
+
+    Имеет смысл только с кэширующим загрузчиком, то есть без DEBUG.
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith(TEMPLATE_EXTENSIONS):
+                        engine.get_template(os.path.relpath(
+                            os.path.join(root, name), directory))
+                        count += 1
+    return count
+
+
+def warm_thumbnails():
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+    import_string(thumbnail_settings.THUMBNAIL_ENGINE)
+
+
+def warm(freeze=True) -> dict:
+    """Прогревает процесс, возвращает число объектов и время по шагам."""
+    report = {}
+    for name, step in (
+        ('urls', warm_urls),
+        ('models', warm_models),
+        ('templates', warm_templates),
+        ('thumbnails', warm_thumbnails),
+    ):
+        start = time.perf_counter()
+        report[name] = (step(), time.perf_counter() - start)
+    # Открытое соединение нельзя делить между процессами после fork.
+    connections.close_all()
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    return report
@@ -0,0 +1,15 @@
+"""Точки входа процессов пула runworker.
+
+Модуль не импортирует модели: дочерний процесс запускается через spawn
+и сначала должен настроить Django.
+"""
+import django
+
+
+def setup():
+    django.setup()
+
+
+def execute(pk) -> str:
+    from core.jobs import run_job
+    return run_job(pk)
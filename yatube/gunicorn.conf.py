@@ -0,0 +1,85 @@
+"""Настройки gunicorn. Запуск из каталога yatube:
+
+    gunicorn yatube.wsgi
+
+gunicorn сам читает gunicorn.conf.py из текущего каталога. Все значения
+можно переопределить переменными окружения GUNICORN_*.
+
+При preload_app приложение загружается и прогревается в мастере (см.
+core.warmup), а воркеры получают его после fork общими страницами
+памяти. Цена — HUP перезапускает воркеры, но не перечитывает код:
+для выкладки нужен USR2 и затем QUIT старому мастеру. Без preload
+каждый воркер загружает приложение сам, и HUP подхватывает новый код.
+"""
+import multiprocessing
+import os
+import sys
+
+# Как в wsgi.py: при preload Django импортируется раньше него.
+if sys.version_info < (3, 12):
+    os.environ.setdefault('SETUPTOOLS_USE_DISTUTILS', 'stdlib')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings_production')
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = env_int('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1)
+# Только потоковые воркеры. Поток SSE держит запрос до SSE_MAX_DURATION
+# (300 с), long-poll ждёт до LONG_POLL_TIMEOUT (25 с), см. posts.live.
+# sync-воркер в это время не отчитывается мастеру и убивается через
+# timeout, а несколько открытых страниц постов занимают все воркеры.
+# gthread отчитывается из главного потока, пока запросы ждут в своих;
+# открытых потоков и long-poll одновременно не больше workers * threads.
+# Переходить на sync можно, только если SSE_MAX_DURATION и
+# LONG_POLL_TIMEOUT меньше timeout.
+worker_class = 'gthread'
+threads = env_int('GUNICORN_THREADS', 16)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+# Потоки SSE при перезапуске обрываются по graceful_timeout; браузер
+# переподключается с Last-Event-ID и получает пропущенное.
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Воркер перезапускается после max_requests запросов, чтобы память,
+# набранная фрагментацией, не копилась. Разброс не даёт всем воркерам
+# перезапуститься одновременно.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS',
+                                     '127.0.0.1')
+# Пустое значение отключает журнал запросов.
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    """Снимки метрик прошлого запуска больше не относятся к процессам."""
+    from django.conf import settings
+    if os.path.isdir(settings.METRICS_DIR):
+        for name in os.listdir(settings.METRICS_DIR):
+            os.remove(os.path.join(settings.METRICS_DIR, name))
+
+
+def post_worker_init(worker):
+    # Воркер сбрасывает обработчики сигналов, установленные в мастере.
+    from core import profiling
+    from core.counters import view_counter
+    profiling.install_signal_handler()
+    view_counter.start_timer()
+
+
+def worker_exit(server, worker):
+    """Записывает то, что воркер копил в памяти."""
+    from core.counters import view_counter
+    from core.metrics import registry
+    view_counter.flush()
+    registry.flush()
+
+
+def child_exit(server, worker):
+    # Вызывается в мастере и после того, как воркер убит по timeout.
+    from core import metrics
+    metrics.retire(worker.pid)
@@ -6,6 +6,9 @@ import sys
 
 def main():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    # Как в wsgi.py: stdlib distutils быстрее копии из setuptools.
+    if sys.version_info < (3, 12):
+        os.environ.setdefault('SETUPTOOLS_USE_DISTUTILS', 'stdlib')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
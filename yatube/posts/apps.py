@@ -5,3 +5,6 @@ class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Запись'
     verbose_name_plural = 'Записи'
+
+    def ready(self):
+        from . import signals  # noqa: F401
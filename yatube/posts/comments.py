@@ -0,0 +1,96 @@
+"""Сборка веток комментариев для страницы поста."""
+from collections import defaultdict
+
+from django.db.models import OuterRef, Q, Subquery
+
+from core.pagination import KeysetPage, keyset_page
+from .models import Comment
+
+# Ответы глубже этого уровня на странице поста свёрнуты и подгружаются
+# отдельным запросом поддерева.
+COLLAPSE_DEPTH: int = 3
+# Сколько ответов ветки показывать сразу; остальные подгружаются
+# порциями такого же размера через comment_thread.
+REPLIES_PER_THREAD: int = 20
+
+
+def first_hidden_reply(root):
+    """Путь первого ответа ветки root, не попадающего на страницу поста."""
+    return Subquery(Comment.objects.filter(
+        thread=root, depth__gt=0, depth__lte=COLLAPSE_DEPTH + 1,
+    ).order_by('path').values('path')[
+        REPLIES_PER_THREAD:REPLIES_PER_THREAD + 1])
+
+
+def with_replies(roots):
+    """Корневые комментарии вместе с ответами в порядке обхода дерева.
+
+    Ответы всех веток страницы читаются одним запросом по `(thread, path)`,
+    не больше REPLIES_PER_THREAD на ветку: в `replies_end` у корня путь
+    первого непоказанного ответа. У комментариев на уровне COLLAPSE_DEPTH
+    в `collapsed_replies` — число непоказанных прямых ответов, у последнего
+    видимого комментария обрезанной ветки в `more_replies_after` — путь,
+    с которого продолжает comment_thread.
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    condition = Q()
+    for root in roots:
+        if root.replies_end is None:
+            condition |= Q(thread=root.id)
+        else:
+            condition |= Q(thread=root.id, path__lt=root.replies_end)
+    thread_replies = defaultdict(list)
+    queryset = Comment.objects.filter(
+        condition,
+        depth__gt=0,
+        depth__lte=COLLAPSE_DEPTH + 1,
+    ).select_related('author').order_by('thread_id', 'path')
+    for reply in queryset:
+        thread_replies[reply.thread_id].append(reply)
+    comments = []
+    for root in roots:
+        visible = collapse([root] + thread_replies[root.id])
+        if root.replies_end is not None:
+            visible[-1].more_replies_after = thread_replies[root.id][-1].path
+        comments.extend(visible)
+    return comments
+
+
+def collapse(comments, depth=COLLAPSE_DEPTH):
+    """Убирает комментарии глубже depth, считая их у видимого родителя."""
+    visible = []
+    for comment in comments:
+        comment.collapsed_replies = 0
+        if comment.depth > depth:
+            visible[-1].collapsed_replies += 1
+        else:
+            visible.append(comment)
+    return visible
+
+
+def thread_page(post, position, per_page) -> KeysetPage:
+    """Страница корневых комментариев поста вместе с их ветками."""
+    roots = keyset_page(
+        post.comments.filter(depth=0).select_related('author').annotate(
+            replies_end=first_hidden_reply(OuterRef('pk'))),
+        position,
+        per_page,
+    )
+    return KeysetPage(with_replies(roots), roots.next_cursor)
+
+
+def subtree_page(comment, after=None):
+    """Первые REPLIES_PER_THREAD ответов поддерева comment после пути after.
+
+    Если ответов больше, у последнего в `more_replies_after` — его путь.
+    """
+    queryset = comment.subtree().select_related('author')
+    if after:
+        queryset = queryset.filter(path__gt=after)
+    comments = list(queryset[:REPLIES_PER_THREAD + 1])
+    if len(comments) > REPLIES_PER_THREAD:
+        comments = comments[:REPLIES_PER_THREAD]
+        comments[-1].more_replies_after = comments[-1].path
+    return comments
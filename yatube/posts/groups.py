@@ -0,0 +1,30 @@
+"""Каталог групп: сводки по постам и авторам."""
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Group, GroupStats
+
+
+def refresh_group_stats() -> int:
+    """Пересчитывает сводки всех групп одним агрегирующим запросом."""
+    now = timezone.now()
+    groups = Group.objects.annotate(
+        posts_count=Count('posts'),
+        authors_count=Count('posts__author', distinct=True),
+        last_post=Max('posts__created'),
+    ).values_list('id', 'posts_count', 'authors_count', 'last_post')
+    stats = [
+        GroupStats(
+            group_id=group_id,
+            posts_count=posts_count,
+            authors_count=authors_count,
+            last_post=last_post,
+            computed=now,
+        )
+        for group_id, posts_count, authors_count, last_post in groups
+    ]
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(stats)
+    return len(stats)
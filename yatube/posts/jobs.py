@@ -0,0 +1,70 @@
+"""Фоновые задачи приложения posts, см. core.jobs."""
+from django.contrib.auth import get_user_model
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import job
+from . import groups, notifications, ranking, recommendations, related
+from .models import NotificationFanout, Post
+
+User = get_user_model()
+
+# Миниатюры, которые выводят шаблоны постов.
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+@job
+def index_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        related.index_post(post)
+
+
+@job
+def warm_thumbnails(post_id):
+    """Создаёт миниатюры заранее, а не при первом показе поста."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        for geometry, options in THUMBNAILS:
+            get_thumbnail(post.image, geometry, **options)
+
+
+@job
+def fanout_post(post_id):
+    task = NotificationFanout.objects.filter(post_id=post_id).select_related(
+        'post').first()
+    while task is not None and task.pk is not None:
+        notifications.fanout_chunk(task)
+
+
+@job
+def refresh_suggestions(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        recommendations.refresh_suggestions(user)
+
+
+@job
+def update_ranking():
+    ranking.update_ranking()
+
+
+@job
+def refresh_group_stats():
+    groups.refresh_group_stats()
+
+
+@job
+def rebuild_related():
+    related.rebuild_related()
+
+
+@job
+def rebuild_suggestions():
+    recommendations.rebuild_suggestions()
+
+
+@job
+def send_digests():
+    notifications.send_digests()
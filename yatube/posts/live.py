@@ -0,0 +1,78 @@
+"""Доставка новых комментариев открытым страницам поста."""
+import json
+import time
+
+from django.template.loader import render_to_string
+
+from core.pubsub import get_broker
+
+# Интервал пустых событий, чтобы прокси не рвали SSE-соединение.
+SSE_KEEPALIVE: float = 15
+# Через сколько секунд закрывать поток: браузер переподключится сам,
+# а воркер не будет занят одним клиентом бесконечно.
+SSE_MAX_DURATION: float = 300
+# Сколько секунд long-poll запрос ждёт новый комментарий.
+LONG_POLL_TIMEOUT: float = 25
+# Сколько пропущенных комментариев читать из базы за раз. Long-poll
+# отдаёт одну такую порцию, и клиент сразу просит следующую.
+MISSED_COMMENTS_LIMIT: int = 100
+
+
+def comments_channel(post_id) -> str:
+    return f'post:{post_id}:comments'
+
+
+def comment_message(comment) -> dict:
+    return {
+        'id': comment.id,
+        'parent': comment.parent_id,
+        'html': render_to_string(
+            'posts/includes/comment.html', {'comment': comment}),
+    }
+
+
+def publish_comment(comment):
+    get_broker().publish(
+        comments_channel(comment.post_id), comment_message(comment))
+
+
+def sse_event(message) -> str:
+    data = json.dumps(message, ensure_ascii=False)
+    return 'id: {}\ndata: {}\n\n'.format(message['id'], data)
+
+
+def missed_comments(post, after):
+    """Первые MISSED_COMMENTS_LIMIT комментариев после комментария after."""
+    comments = post.comments.filter(id__gt=after).select_related(
+        'author').order_by('id')[:MISSED_COMMENTS_LIMIT]
+    return [comment_message(comment) for comment in comments]
+
+
+def comments_event_stream(post, after):
+    """SSE-поток: сначала пропущенные комментарии, затем новые.
+
+    Подписка оформляется до чтения пропущенных из базы, чтобы не потерять
+    комментарий, созданный между этими шагами. Пропущенные читаются
+    порциями по MISSED_COMMENTS_LIMIT.
+    """
+    subscription = get_broker().subscribe(comments_channel(post.id))
+    try:
+        yield 'retry: 3000\n\n'
+        last_id = after or 0
+        while after is not None:
+            messages = missed_comments(post, last_id)
+            for message in messages:
+                last_id = message['id']
+                yield sse_event(message)
+            if len(messages) < MISSED_COMMENTS_LIMIT:
+                break
+        deadline = time.monotonic() + SSE_MAX_DURATION
+        while time.monotonic() < deadline:
+            message = subscription.get(SSE_KEEPALIVE)
+            if message is None:
+                yield ': keepalive\n\n'
+            elif message['id'] > last_id:
+                last_id = message['id']
+                yield sse_event(message)
+    finally:
+        subscription.close()
@@ -0,0 +1,11 @@
+"""Поиск групп и авторов по адресу страницы без запроса к базе."""
+from django.contrib.auth import get_user_model
+
+from core.lookups import CachedLookup
+from .models import Group
+
+User = get_user_model()
+
+groups = CachedLookup(Group, 'slug')
+authors = CachedLookup(
+    User, 'username', fields=('id', 'username', 'first_name', 'last_name'))
@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+DUMMY_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+
+def production_templates():
+    """Настройки шаблонов как при DEBUG = False."""
+    templates = []
+    for backend in settings.TEMPLATES:
+        options = dict(backend.get('OPTIONS', {}))
+        loaders = options.get('loaders', settings.TEMPLATE_LOADERS)
+        if loaders[0][0] != 'django.template.loaders.cached.Loader':
+            loaders = [('django.template.loaders.cached.Loader', loaders)]
+        options.update(debug=False, loaders=loaders)
+        templates.append(dict(backend, APP_DIRS=False, OPTIONS=options))
+    return templates
+
+
+def make_posts(count):
+    """Несохранённые посты: бенчмарк не должен зависеть от БД."""
+    author = User(id=1, username='bench', first_name='Лев',
+                  last_name='Толстой')
+    group = Group(id=1, title='Бенчмарк', slug='bench',
+                  description='Группа для бенчмарка')
+    now = timezone.now()
+    return [
+        Post(id=i, text=f'Текст поста {i} ' * 20, author=author,
+             group=group, created=now, updated=now)
+        for i in range(1, count + 1)
+    ], author, group
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время рендеринга страниц ленты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10,
+                            help='Постов на странице.')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Количество рендеров каждой страницы.')
+        parser.add_argument('--budget', type=float,
+                            help='Допустимая медиана, мс на страницу.')
+        parser.add_argument('--no-cached-loader', action='store_true',
+                            help='Использовать текущие настройки TEMPLATES.')
+
+    def handle(self, *args, **options):
+        posts, author, group = make_posts(options['posts'])
+        page_obj = Paginator(posts, options['posts']).get_page(1)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        pages = {
+            'posts/index.html': {'page_obj': page_obj},
+            'posts/follow.html': {'page_obj': page_obj},
+            'posts/group_list.html': {'page_obj': page_obj, 'group': group},
+            'posts/profile.html': {'page_obj': page_obj, 'author': author},
+        }
+        overrides = {'CACHES': DUMMY_CACHES}
+        if not options['no_cached_loader']:
+            overrides['TEMPLATES'] = production_templates()
+        slowest = 0
+        with override_settings(**overrides):
+            for template_name, context in pages.items():
+                # Первый рендер прогревает загрузчик шаблонов.
+                render_to_string(template_name, context, request)
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    render_to_string(template_name, context, request)
+                    timings.append((time.perf_counter() - start) * 1000)
+                median = statistics.median(timings)
+                slowest = max(slowest, median)
+                self.stdout.write(
+                    f'{template_name}: median {median:.3f} ms, '
+                    f'min {min(timings):.3f} ms'
+                )
+        budget = options['budget']
+        if budget is not None and slowest > budget:
+            raise CommandError(
+                f'Медиана {slowest:.3f} ms превышает бюджет {budget} ms'
+            )
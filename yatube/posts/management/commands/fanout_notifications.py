@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import fanout
+
+
+class Command(BaseCommand):
+    help = 'Раздаёт подписчикам уведомления о новых постах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Подписчиков за одну транзакцию.')
+        parser.add_argument('--limit', type=int,
+                            help='Обработать не больше стольких постов.')
+
+    def handle(self, *args, **options):
+        count = fanout(options['chunk_size'], options['limit'])
+        self.stdout.write(f'Создано уведомлений: {count}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.ranking import update_ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярных постов. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать все посты, а не изменившиеся.')
+
+    def handle(self, *args, **options):
+        count = update_ranking(full=options['full'])
+        self.stdout.write(f'Пересчитано постов: {count}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.groups import refresh_group_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сводки для каталога групп. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        count = refresh_group_stats()
+        self.stdout.write(f'Пересчитано групп: {count}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.related import rebuild_related
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие посты по полной статистике слов. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_related()
+        self.stdout.write(f'Проиндексировано постов: {count}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет дайджесты непрочитанных уведомлений. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        count = send_digests()
+        self.stdout.write(f'Отправлено дайджестов: {count}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации подписок по полному графу. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_suggestions()
+        self.stdout.write(f'Пересчитано пользователей: {count}')
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:01
+
+from django.db import migrations, models
+from django.utils.http import int_to_base36
+import django.db.models.deletion
+
+
+def make_existing_comments_roots(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    for comment in Comment.objects.only('id').iterator():
+        Comment.objects.filter(pk=comment.pk).update(
+            thread=comment.pk,
+            path=int_to_base36(comment.pk).rjust(7, '0'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='posts_comme_post_id_bbe34c_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=217, verbose_name='Путь в ветке'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Ветка'),
+        ),
+        migrations.RunPython(
+            make_existing_comments_roots, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', '-created', '-id'], name='posts_comme_post_id_e3db36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'path'], name='posts_comme_thread__f15131_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('authors_count', models.PositiveIntegerField(default=0, verbose_name='Число авторов')),
+                ('last_post', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста')),
+                ('computed', models.DateTimeField(verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Сводка по группе',
+                'verbose_name_plural': 'Сводки по группам',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:47
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_notifications(apps, schema_editor):
+    Notification = apps.get_model('posts', 'Notification')
+    duplicates = Notification.objects.order_by().values(
+        'user', 'post',
+    ).annotate(first=Min('id'), count=Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        Notification.objects.filter(
+            user=duplicate['user'], post=duplicate['post'],
+        ).exclude(pk=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_notifications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='notification_user_post'),
+        ),
+    ]
@@ -1,10 +1,16 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.http import int_to_base36
 
-from core.models import CreatedModel
+from core.models import CreatedModel, VersionedModel
 
 User = get_user_model()
 
+# Символов пути на уровень дерева комментариев: id в base36 фиксированной
+# ширины, чтобы строковый порядок путей совпадал с порядком обхода дерева.
+COMMENT_PATH_STEP: int = 7
+MAX_COMMENT_DEPTH: int = 30
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -27,7 +33,38 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
-class Post(CreatedModel):
+class GroupStats(models.Model):
+    """Сводка по группе для каталога, пересчитывается периодически."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0
+    )
+    authors_count = models.PositiveIntegerField(
+        verbose_name='Число авторов',
+        default=0
+    )
+    last_post = models.DateTimeField(
+        verbose_name='Дата последнего поста',
+        null=True,
+        blank=True
+    )
+    computed = models.DateTimeField(
+        verbose_name='Дата расчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Сводка по группе'
+        verbose_name_plural = 'Сводки по группам'
+
+
+class Post(VersionedModel):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Текст нового поста',
@@ -52,17 +89,35 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    views = models.PositiveIntegerField(
+        verbose_name='Просмотры',
+        default=0,
+        editable=False
+    )
 
     def __str__(self) -> str:
         return self.text[:15]
 
     class Meta:
         ordering = ('-created',)
+        # Ленты и выборка новых постов идут диапазоном по дате создания.
+        indexes = (
+            models.Index(fields=('-created',)),
+            models.Index(fields=('group', '-created')),
+            models.Index(fields=('author', '-created')),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
 
-class Comment(CreatedModel):
+class Comment(VersionedModel):
+    """Комментарий к посту.
+
+    Ответы хранятся деревом с материализованным путём: `path` — это пути
+    предков плюс собственный id, `thread` — корневой комментарий ветки.
+    Ветка или поддерево читаются одним диапазонным запросом по
+    `(thread, path)` сразу в порядке обхода.
+    """
     text = models.TextField(
         verbose_name='Текст комментария',
         help_text='Текст нового комментария',
@@ -79,15 +134,83 @@ class Comment(CreatedModel):
         related_name='comments',
         verbose_name='Пост'
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на'
+    )
+    thread = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        editable=False,
+        verbose_name='Ветка'
+    )
+    path = models.CharField(
+        max_length=COMMENT_PATH_STEP * (MAX_COMMENT_DEPTH + 1),
+        editable=False,
+        verbose_name='Путь в ветке'
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Глубина'
+    )
 
     def __str__(self) -> str:
         return self.text[:15]
 
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            # Корневые комментарии поста читаются страницами
+            # по ключу (created, id).
+            models.Index(fields=('post', 'depth', '-created', '-id')),
+            models.Index(fields=('thread', 'path')),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        parent = self.parent if self.parent_id else None
+        if adding and parent is not None:
+            if parent.depth >= MAX_COMMENT_DEPTH:
+                # Слишком глубокие ответы становятся соседями родителя.
+                parent = self.parent = parent.parent
+            self.depth = parent.depth + 1
+            self.thread_id = parent.thread_id
+        super().save(*args, **kwargs)
+        if adding:
+            # id известен только после вставки.
+            self.path = (parent.path if parent else '') + comment_path_segment(
+                self.pk)
+            self.thread_id = self.thread_id or self.pk
+            Comment.objects.filter(pk=self.pk).update(
+                path=self.path,
+                thread=self.thread_id,
+                version=self.version,
+                updated=self.updated,
+            )
+
+    def subtree(self):
+        """Ответы на комментарий на любой глубине в порядке обхода."""
+        return Comment.objects.filter(
+            thread=self.thread_id,
+            path__gt=self.path,
+            # Символы base36 меньше `~`: это верхняя граница префикса.
+            path__lt=self.path + '~',
+        ).order_by('path')
+
+
+def comment_path_segment(pk) -> str:
+    return int_to_base36(pk).rjust(COMMENT_PATH_STEP, '0')
+
 
 class Follow(CreatedModel):
     author = models.ForeignKey(
@@ -106,3 +229,159 @@ class Follow(CreatedModel):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class PostRank(models.Model):
+    """Предрасчитанный рейтинг поста для ленты популярного."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(
+        verbose_name='Рейтинг',
+        db_index=True
+    )
+    views = models.PositiveIntegerField(
+        verbose_name='Просмотры при расчёте',
+        default=0
+    )
+    computed = models.DateTimeField(
+        verbose_name='Дата расчёта'
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+
+class FollowSuggestion(models.Model):
+    """Предрасчитанная рекомендация, на кого подписаться."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь'
+    )
+    suggested = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор'
+    )
+    score = models.FloatField(
+        verbose_name='Оценка'
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        unique_together = ('user', 'suggested')
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+
+
+class PostTerm(models.Model):
+    """Вес слова в нормированном TF-IDF векторе поста."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Пост'
+    )
+    term = models.CharField(
+        verbose_name='Слово',
+        max_length=64,
+        db_index=True
+    )
+    weight = models.FloatField(
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        unique_together = ('post', 'term')
+        verbose_name = 'Слово поста'
+        verbose_name_plural = 'Слова постов'
+
+
+class RelatedPost(models.Model):
+    """Предрасчитанный похожий пост."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Пост'
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий пост'
+    )
+    score = models.FloatField(
+        verbose_name='Косинусная близость'
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        unique_together = ('post', 'related')
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+
+
+class Notification(CreatedModel):
+    """Уведомление подписчика о новом посте автора."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    read = models.BooleanField(
+        verbose_name='Прочитано',
+        default=False
+    )
+    emailed = models.BooleanField(
+        verbose_name='Отправлено в дайджесте',
+        default=False
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(fields=('user', 'read', '-created')),
+            models.Index(fields=('emailed', 'user')),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='notification_user_post'),
+        ]
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+
+class NotificationFanout(models.Model):
+    """Рассылка уведомлений о посте, ещё не дошедшая до всех подписчиков."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    last_follow_id = models.PositiveIntegerField(
+        verbose_name='Последняя обработанная подписка',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Рассылка уведомлений'
+        verbose_name_plural = 'Рассылки уведомлений'
@@ -0,0 +1,132 @@
+"""Уведомления подписчиков о новых постах.
+
+post_create ставит пост в NotificationFanout и задачу fanout_post
+в очередь, больше рассылку никто не запускает. Задача раздаёт
+уведомления подписчикам порциями по FANOUT_CHUNK_SIZE, запоминая
+последнюю обработанную подписку, поэтому рассылку автора с сотнями
+тысяч подписчиков можно прервать и продолжить. Рассылки, задачи которых
+исчерпали попытки, дораздаёт команда fanout_notifications.
+Команда send_digests раз в период собирает непрочитанные уведомления
+в одно письмо на пользователя.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from .models import Follow, Notification, NotificationFanout
+
+User = get_user_model()
+
+FANOUT_CHUNK_SIZE: int = 1000
+DIGEST_BATCH_SIZE: int = 500
+DIGEST_MAX_POSTS: int = 20
+
+
+def schedule_fanout(post):
+    NotificationFanout.objects.create(post=post)
+
+
+def fanout_chunk(task, chunk_size=FANOUT_CHUNK_SIZE) -> int:
+    """Создаёт уведомления для следующей порции подписчиков.
+
+    Порция забирается условным UPDATE или DELETE по last_follow_id.
+    Если её уже забрал другой процесс, уведомления не создаются, а task
+    получает текущее состояние рассылки; pk None — рассылка закончена.
+    """
+    post_id = task.post_id
+    follows = list(
+        Follow.objects.filter(
+            author_id=task.post.author_id, id__gt=task.last_follow_id,
+        ).order_by('id').values_list('id', 'user_id')[:chunk_size]
+    )
+    claim = NotificationFanout.objects.filter(
+        pk=post_id, last_follow_id=task.last_follow_id)
+    with transaction.atomic():
+        if len(follows) < chunk_size:
+            claimed, _ = claim.delete()
+        else:
+            claimed = claim.update(last_follow_id=follows[-1][0])
+        if claimed:
+            Notification.objects.bulk_create(
+                (Notification(user_id=user_id, post_id=post_id)
+                 for _, user_id in follows),
+                ignore_conflicts=True,
+            )
+    if not claimed:
+        current = NotificationFanout.objects.filter(pk=post_id).first()
+        if current is None:
+            task.pk = None
+        else:
+            task.last_follow_id = current.last_follow_id
+        return 0
+    if len(follows) < chunk_size:
+        task.pk = None
+    else:
+        task.last_follow_id = follows[-1][0]
+    return len(follows)
+
+
+def fanout(chunk_size=FANOUT_CHUNK_SIZE, limit=None) -> int:
+    """Раздаёт уведомления по всем рассылкам, возвращает их число."""
+    created = 0
+    tasks = NotificationFanout.objects.select_related('post')
+    for task in tasks.order_by('post_id')[:limit]:
+        while task.pk is not None:
+            created += fanout_chunk(task, chunk_size)
+    return created
+
+
+def digest_message(user, posts):
+    return EmailMessage(
+        subject='Новые записи авторов, на которых вы подписаны',
+        body=render_to_string(
+            'posts/email/digest.txt', {'user': user, 'posts': posts}),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def send_digests(batch_size=DIGEST_BATCH_SIZE) -> int:
+    """Отправляет дайджесты непрочитанных уведомлений.
+
+    Пользователи обрабатываются пачками по batch_size, письма пачки уходят
+    через одно соединение. Отправленными отмечаются ровно прочитанные
+    из базы уведомления: созданные во время рассылки уйдут в следующий
+    раз. Возвращает число писем.
+    """
+    sent = 0
+    last_user_id = 0
+    pending = Notification.objects.filter(emailed=False)
+    while True:
+        user_ids = list(
+            pending.filter(user_id__gt=last_user_id).order_by('user_id')
+            .values_list('user_id', flat=True).distinct()[:batch_size]
+        )
+        if not user_ids:
+            return sent
+        last_user_id = user_ids[-1]
+        posts = defaultdict(list)
+        seen = []
+        notifications = pending.filter(
+            user__in=user_ids,
+        ).select_related('post__author').order_by('-created')
+        for notification in notifications:
+            seen.append(notification.pk)
+            if (not notification.read
+                    and len(posts[notification.user_id]) < DIGEST_MAX_POSTS):
+                posts[notification.user_id].append(notification.post)
+        messages = [
+            digest_message(user, posts[user.pk])
+            for user in User.objects.filter(
+                pk__in=[pk for pk in posts if posts[pk]]).exclude(email='')
+        ]
+        get_connection().send_messages(messages)
+        for start in range(0, len(seen), DIGEST_BATCH_SIZE):
+            Notification.objects.filter(
+                pk__in=seen[start:start + DIGEST_BATCH_SIZE],
+            ).update(emailed=True)
+        sent += len(messages)
@@ -0,0 +1,84 @@
+"""Расчёт рейтинга постов для ленты популярного.
+
+Рейтинг — логарифм веса поста плюс время публикации, делённое на
+постоянную затухания: `ln(1 + вес) + created / DECAY`. Вес поста
+со временем затухает экспоненциально, но порядок постов от течения
+времени не меняется. Поэтому пересчитывать нужно только посты, у которых
+изменился вес, а не всю таблицу.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone as django_timezone
+
+from .models import Comment, Follow, Post, PostRank
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Вес поста уменьшается вдвое за это время.
+HALF_LIFE = timedelta(hours=12)
+DECAY_SECONDS = HALF_LIFE.total_seconds() / math.log(2)
+# Более старые посты из рейтинга удаляются.
+RANKING_WINDOW = timedelta(days=30)
+
+VIEW_WEIGHT: float = 1
+COMMENT_WEIGHT: float = 5
+FOLLOWER_WEIGHT: float = 0.5
+
+
+def post_score(created, views, comments, followers) -> float:
+    weight = (
+        views * VIEW_WEIGHT
+        + comments * COMMENT_WEIGHT
+        + followers * FOLLOWER_WEIGHT
+    )
+    age = (created - EPOCH).total_seconds()
+    return math.log1p(weight) + age / DECAY_SECONDS
+
+
+def changed_posts(posts, since):
+    """Посты, вес которых мог измениться после прошлого расчёта."""
+    return posts.filter(
+        Q(rank__isnull=True)
+        | ~Q(views=F('rank__views'))
+        | Q(comments__created__gt=since)
+        | Q(author__following__created__gt=since)
+    ).distinct()
+
+
+def update_ranking(full=False) -> int:
+    """Пересчитывает рейтинг изменившихся постов, возвращает их число."""
+    now = django_timezone.now()
+    PostRank.objects.filter(post__created__lt=now - RANKING_WINDOW).delete()
+    posts = Post.objects.filter(created__gte=now - RANKING_WINDOW)
+    since = PostRank.objects.aggregate(Max('computed'))['computed__max']
+    if not full and since is not None:
+        posts = changed_posts(posts, since)
+    posts = list(posts.values('id', 'created', 'views', 'author_id'))
+    if not posts:
+        return 0
+    ids = [post['id'] for post in posts]
+    comments = dict(
+        Comment.objects.filter(post__in=ids).values_list('post')
+        .annotate(count=Count('id')).order_by()
+    )
+    followers = dict(
+        Follow.objects.filter(author__in={post['author_id'] for post in posts})
+        .values_list('author').annotate(count=Count('id')).order_by()
+    )
+    PostRank.objects.filter(post__in=ids).delete()
+    PostRank.objects.bulk_create(
+        PostRank(
+            post_id=post['id'],
+            views=post['views'],
+            computed=now,
+            score=post_score(
+                post['created'],
+                post['views'],
+                comments.get(post['id'], 0),
+                followers.get(post['author_id'], 0),
+            ),
+        )
+        for post in posts
+    )
+    return len(posts)
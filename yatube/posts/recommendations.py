@@ -0,0 +1,124 @@
+"""Рекомендации «на кого подписаться» по графу подписок.
+
+Граф хранится как разреженная матрица смежности: для каждого пользователя
+множество авторов, на которых он подписан, и множество его подписчиков.
+Оценка кандидата складывается из двух произведений строк матрицы:
+
+* друзья друзей — сколько авторов пользователя подписаны на кандидата;
+* совместные подписки — подписки пользователей со схожим набором
+  авторов, с весом по косинусной близости наборов.
+
+Рекомендации хранятся в FollowSuggestion и пересчитываются целиком
+командой suggest_follows, а после подписки или отписки — только для
+затронутых пользователей.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Follow, FollowSuggestion
+
+SUGGESTIONS_PER_USER: int = 10
+FRIEND_OF_FRIEND_WEIGHT: float = 1
+CO_FOLLOW_WEIGHT: float = 2
+# Больше пользователей за одну подписку не пересчитывается,
+# остальных догонит полный пересчёт.
+MAX_REFRESH_USERS: int = 100
+# Столько последних подписчиков авторов пользователя читается для
+# совместных подписок: у знаменитости их могут быть миллионы.
+MAX_CO_FOLLOWERS: int = 1000
+# Рекомендации пишутся пачками пользователей, каждая в своей транзакции:
+# списки id остаются в пределах числа параметров SQLite, а база
+# не блокируется на запись на весь пересчёт.
+STORE_BATCH_SIZE: int = 500
+
+
+class FollowGraph:
+    def __init__(self, edges):
+        self.following = defaultdict(set)
+        self.followers = defaultdict(set)
+        for user_id, author_id in edges:
+            self.following[user_id].add(author_id)
+            self.followers[author_id].add(user_id)
+
+    @classmethod
+    def around(cls, user_ids):
+        """Часть графа, достаточная для рекомендаций этим пользователям."""
+        followees = Follow.objects.filter(user__in=user_ids).values('author')
+        co_followers = Follow.objects.filter(
+            author__in=followees,
+        ).order_by('-id').values('user')[:MAX_CO_FOLLOWERS]
+        return cls(Follow.objects.filter(
+            Q(user__in=user_ids)
+            | Q(user__in=followees)
+            | Q(user__in=co_followers)
+        ).values_list('user_id', 'author_id'))
+
+    def similar_users(self, user_id):
+        """Пользователи с общими подписками и косинусная близость к ним."""
+        common = defaultdict(int)
+        for author_id in self.following[user_id]:
+            for other_id in self.followers[author_id]:
+                if other_id != user_id:
+                    common[other_id] += 1
+        size = len(self.following[user_id])
+        return {
+            other_id: count / math.sqrt(size * len(self.following[other_id]))
+            for other_id, count in common.items()
+        }
+
+    def suggest(self, user_id, limit=SUGGESTIONS_PER_USER):
+        """Список `(оценка, id автора)` по убыванию оценки."""
+        scores = defaultdict(float)
+        for author_id in self.following[user_id]:
+            for candidate_id in self.following[author_id]:
+                scores[candidate_id] += FRIEND_OF_FRIEND_WEIGHT
+        for other_id, similarity in self.similar_users(user_id).items():
+            for candidate_id in self.following[other_id]:
+                scores[candidate_id] += CO_FOLLOW_WEIGHT * similarity
+        excluded = self.following[user_id] | {user_id}
+        return heapq.nlargest(
+            limit,
+            ((score, candidate_id) for candidate_id, score in scores.items()
+             if candidate_id not in excluded),
+        )
+
+
+def store_suggestions(graph, user_ids):
+    for start in range(0, len(user_ids), STORE_BATCH_SIZE):
+        batch = user_ids[start:start + STORE_BATCH_SIZE]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user__in=batch).delete()
+            FollowSuggestion.objects.bulk_create(
+                FollowSuggestion(
+                    user_id=user_id, suggested_id=candidate_id, score=score)
+                for user_id in batch
+                for score, candidate_id in graph.suggest(user_id)
+            )
+
+
+def rebuild_suggestions() -> int:
+    """Пересчитывает рекомендации всех пользователей по полному графу."""
+    graph = FollowGraph(Follow.objects.values_list('user_id', 'author_id'))
+    user_ids = list(graph.following)
+    FollowSuggestion.objects.exclude(
+        user__in=Follow.objects.values('user')).delete()
+    store_suggestions(graph, user_ids)
+    return len(user_ids)
+
+
+def refresh_suggestions(user):
+    """Пересчёт после того, как user подписался или отписался.
+
+    Меняются рекомендации самого пользователя и друзья друзей у его
+    подписчиков. Совместные подписки остальных пользователей обновит
+    полный пересчёт.
+    """
+    user_ids = [user.id] + list(
+        Follow.objects.filter(author=user)
+        .values_list('user_id', flat=True)[:MAX_REFRESH_USERS]
+    )
+    store_suggestions(FollowGraph.around(user_ids), user_ids)
@@ -0,0 +1,156 @@
+"""Похожие посты по TF-IDF векторам текста.
+
+Каждый пост — разреженный нормированный вектор весов слов, хранится
+в PostTerm. Косинусная близость двух постов — скалярное произведение
+их векторов; для поиска соседей вектор поста умножается на обратный
+индекс «слово → посты», так что перебираются только посты с общими
+словами. Готовые списки соседей лежат в RelatedPost, и на странице
+поста это один запрос.
+
+Команда relate_posts пересчитывает всё по полной статистике корпуса
+и записывает результат пачками по BATCH_SIZE постов, каждую в своей
+транзакции: база не блокируется на запись на весь пересчёт, а страница
+поста видит либо старые, либо новые соседи этого поста. Новые
+и отредактированные посты индексируются сразу, с текущей частотой слов;
+веса остальных постов обновит следующий полный пересчёт.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Post, PostTerm, RelatedPost
+
+RELATED_PER_POST: int = 5
+# Слова вектора поста с наибольшими весами, остальные отбрасываются.
+MAX_TERMS: int = 50
+# Слова, которые встречаются в большем числе постов, для поиска
+# соседей не используются: они почти ничего не говорят о близости.
+MAX_POSTINGS: int = 1000
+BATCH_SIZE: int = 500
+CORPUS_SIZE_TIMEOUT: int = 60 * 60
+
+# Слова длиннее поля PostTerm.term пропускаются.
+WORD_RE = re.compile(r'\b\w{3,64}\b')
+
+
+def tokenize(text) -> Counter:
+    return Counter(WORD_RE.findall(text.lower()))
+
+
+def tfidf(counts, df, corpus_size) -> dict:
+    """Нормированный вектор `{слово: вес}` по частотам слов поста."""
+    weights = {
+        term: (1 + math.log(count))
+        * (math.log((1 + corpus_size) / (1 + df.get(term, 0))) + 1)
+        for term, count in counts.items()
+    }
+    weights = dict(heapq.nlargest(
+        MAX_TERMS, weights.items(), key=lambda item: item[1]))
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()}
+
+
+def searchable(document_frequency) -> bool:
+    """Искать ли соседей по слову из стольких постов, считая текущий."""
+    return document_frequency <= MAX_POSTINGS
+
+
+def nearest(vector, postings, post_id, limit=RELATED_PER_POST):
+    """Список `(близость, id поста)` ближайших соседей вектора."""
+    scores = defaultdict(float)
+    for term, weight in vector.items():
+        for other_id, other_weight in postings.get(term, ()):
+            scores[other_id] += weight * other_weight
+    scores.pop(post_id, None)
+    return heapq.nlargest(
+        limit, ((score, other_id) for other_id, score in scores.items()))
+
+
+def rebuild_related() -> int:
+    """Пересчитывает векторы и соседей всех постов."""
+    counts = {
+        post_id: tokenize(text)
+        for post_id, text in Post.objects.values_list('id', 'text').iterator()
+    }
+    df = Counter(term for terms in counts.values() for term in terms)
+    vectors = {
+        post_id: tfidf(terms, df, len(counts))
+        for post_id, terms in counts.items() if terms
+    }
+    postings = defaultdict(list)
+    for post_id, vector in vectors.items():
+        for term, weight in vector.items():
+            if searchable(df[term]):
+                postings[term].append((post_id, weight))
+    post_ids = sorted(counts)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        batch = post_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            PostTerm.objects.filter(post__in=batch).delete()
+            RelatedPost.objects.filter(post__in=batch).delete()
+            PostTerm.objects.bulk_create(
+                PostTerm(post_id=post_id, term=term, weight=weight)
+                for post_id in batch
+                for term, weight in vectors.get(post_id, {}).items()
+            )
+            RelatedPost.objects.bulk_create(
+                RelatedPost(post_id=post_id, related_id=other_id, score=score)
+                for post_id in batch if post_id in vectors
+                for score, other_id in nearest(
+                    vectors[post_id], postings, post_id)
+            )
+    cache.set('related:corpus_size', len(counts), CORPUS_SIZE_TIMEOUT)
+    return len(vectors)
+
+
+def corpus_size() -> int:
+    return cache.get_or_set(
+        'related:corpus_size', Post.objects.count, CORPUS_SIZE_TIMEOUT)
+
+
+def index_post(post):
+    """Индексирует новый или изменённый пост и обновляет его соседей.
+
+    Пост получает свой список соседей, а сам добавляется в списки
+    найденных соседей; лишние записи в их списках не мешают, на странице
+    показываются только самые близкие.
+    """
+    counts = tokenize(post.text)
+    df = dict(
+        PostTerm.objects.filter(term__in=list(counts)).exclude(post=post)
+        .values_list('term').annotate(count=Count('id')).order_by()
+    )
+    vector = {}
+    neighbours = []
+    if counts:
+        vector = tfidf(
+            counts,
+            {term: df.get(term, 0) + 1 for term in counts},
+            corpus_size(),
+        )
+        postings = defaultdict(list)
+        candidates = PostTerm.objects.filter(
+            term__in=[term for term in vector
+                      if searchable(df.get(term, 0) + 1)],
+        ).exclude(post=post).values_list('term', 'post_id', 'weight')
+        for term, other_id, weight in candidates:
+            postings[term].append((other_id, weight))
+        neighbours = nearest(vector, postings, post.id)
+    with transaction.atomic():
+        post.terms.all().delete()
+        RelatedPost.objects.filter(Q(post=post) | Q(related=post)).delete()
+        PostTerm.objects.bulk_create(
+            PostTerm(post=post, term=term, weight=weight)
+            for term, weight in vector.items()
+        )
+        RelatedPost.objects.bulk_create(
+            [RelatedPost(post=post, related_id=other_id, score=score)
+             for score, other_id in neighbours]
+            + [RelatedPost(post_id=other_id, related=post, score=score)
+               for score, other_id in neighbours]
+        )
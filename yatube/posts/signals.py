@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .lookups import User, authors, groups
+from .models import Group
+
+
+def invalidate_old_value(lookup, instance, update_fields):
+    """Сбрасывает кэш по прежнему значению поля, если оно меняется."""
+    if instance.pk is None or not lookup.affected_by(update_fields):
+        return
+    old = type(instance)._default_manager.filter(pk=instance.pk).values_list(
+        lookup.field, flat=True).first()
+    if old is not None and old != getattr(instance, lookup.field):
+        lookup.invalidate(old)
+
+
+@receiver(pre_save, sender=Group)
+def group_pre_save(sender, instance, update_fields=None, **kwargs):
+    invalidate_old_value(groups, instance, update_fields)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    groups.invalidate(instance.slug)
+
+
+@receiver(pre_save, sender=User)
+def author_pre_save(sender, instance, update_fields=None, **kwargs):
+    invalidate_old_value(authors, instance, update_fields)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    if authors.affected_by(update_fields):
+        authors.invalidate(instance.username)
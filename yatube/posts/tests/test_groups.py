@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.groups import refresh_group_stats
+from posts.models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.user_2 = User.objects.create_user(username='AnotherAuthor')
+        cls.active = Group.objects.create(
+            title='Активная', slug='active', description='Описание')
+        cls.empty = Group.objects.create(
+            title='Пустая', slug='empty', description='Описание')
+        for author in (cls.user, cls.user, cls.user_2):
+            Post.objects.create(author=author, text='Текст', group=cls.active)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_refresh_group_stats(self):
+        """Сводка считает посты, авторов и дату последнего поста."""
+        self.assertEqual(refresh_group_stats(), 2)
+        stats = GroupStats.objects.get(group=self.active)
+        self.assertEqual(stats.posts_count, 3)
+        self.assertEqual(stats.authors_count, 2)
+        self.assertEqual(
+            stats.last_post, Post.objects.latest('created').created)
+        self.assertIsNone(GroupStats.objects.get(group=self.empty).last_post)
+
+    def test_directory_lists_groups_from_summary(self):
+        """Каталог не агрегирует посты и ставит активные группы выше."""
+        refresh_group_stats()
+        with self.assertNumQueries(2):
+            response = Client().get(reverse('posts:group_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.active, self.empty])
+        self.assertContains(response, '<td>3</td>', html=True)
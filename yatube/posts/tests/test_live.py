@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.pubsub import get_broker
+from posts.live import comments_channel
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class LiveCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.post, text='Первый комментарий')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_add_comment_publishes_to_subscribers(self):
+        """Новый комментарий сразу уходит подписчикам поста."""
+        channel = comments_channel(self.post.id)
+        with get_broker().subscribe(channel) as subscription:
+            self.authorized_client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+                data={'text': 'Живой комментарий'},
+            )
+            message = subscription.get(timeout=1)
+        self.assertIn('Живой комментарий', message['html'])
+        self.assertEqual(
+            message['id'], Comment.objects.get(text='Живой комментарий').id)
+
+    def test_stream_replays_missed_comments(self):
+        """SSE-поток начинается с комментариев после Last-Event-ID."""
+        response = self.authorized_client.get(
+            reverse('posts:comments_stream',
+                    kwargs={'post_id': self.post.id}),
+            HTTP_LAST_EVENT_ID='0',
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+        event = next(stream).decode()
+        response.close()
+        self.assertTrue(event.startswith(f'id: {self.comment.id}\n'))
+        self.assertIn('Первый комментарий', event)
+
+    def test_poll_returns_missed_comments_immediately(self):
+        """Long-poll сразу отдаёт уже существующие новые комментарии."""
+        response = self.authorized_client.get(
+            reverse('posts:comments_poll', kwargs={'post_id': self.post.id}),
+            {'after': 0},
+        )
+        comments = response.json()['comments']
+        self.assertEqual([c['id'] for c in comments], [self.comment.id])
+
+    @mock.patch('posts.live.MISSED_COMMENTS_LIMIT', 2)
+    def test_missed_comments_are_replayed_in_chunks(self):
+        """Long-poll отдаёт порцию, поток — все порции подряд."""
+        comments = [self.comment] + [
+            Comment.objects.create(
+                author=self.user, post=self.post, text=f'Комментарий {i}')
+            for i in range(2)
+        ]
+        url = reverse('posts:comments_poll', kwargs={'post_id': self.post.id})
+        first = self.authorized_client.get(url, {'after': 0}).json()
+        self.assertEqual([c['id'] for c in first['comments']],
+                         [c.id for c in comments[:2]])
+        rest = self.authorized_client.get(
+            url, {'after': first['comments'][-1]['id']}).json()
+        self.assertEqual([c['id'] for c in rest['comments']],
+                         [comments[2].id])
+
+        response = self.authorized_client.get(
+            reverse('posts:comments_stream',
+                    kwargs={'post_id': self.post.id}),
+            HTTP_LAST_EVENT_ID='0',
+        )
+        stream = iter(response.streaming_content)
+        next(stream)
+        events = [next(stream).decode() for _ in comments]
+        response.close()
+        self.assertEqual([event.split('\n')[0] for event in events],
+                         [f'id: {comment.id}' for comment in comments])
+
+    @mock.patch('posts.views.LONG_POLL_TIMEOUT', 0.01)
+    def test_poll_without_new_comments_returns_no_content(self):
+        """Если новых комментариев нет, long-poll отвечает 204."""
+        response = self.authorized_client.get(
+            reverse('posts:comments_poll', kwargs={'post_id': self.post.id}),
+            {'after': self.comment.id},
+        )
+        self.assertEqual(response.status_code, 204)
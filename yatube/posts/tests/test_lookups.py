@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.lookups import authors, groups
+from posts.models import Group
+
+User = get_user_model()
+
+
+class CachedLookupTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='HasNoName', first_name='Имя')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        authors.local.clear()
+        groups.local.clear()
+
+    def test_lookup_is_cached(self):
+        """Повторный поиск не обращается к базе."""
+        self.assertEqual(groups.get('test-slug'), self.group)
+        self.assertEqual(authors.get('HasNoName'), self.user)
+        with self.assertNumQueries(0):
+            group = groups.get('test-slug')
+            author = authors.get('HasNoName')
+        self.assertEqual(group.title, 'Тестовая группа')
+        self.assertEqual(author.get_full_name(), 'Имя')
+        self.assertIsNone(groups.get('missing'))
+        with self.assertRaises(Http404):
+            authors.get_or_404('missing')
+
+    def test_changes_invalidate_cache(self):
+        """Переименование и удаление сбрасывают кэш."""
+        group = Group.objects.get(pk=self.group.pk)
+        groups.get('test-slug')
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(groups.get('test-slug'))
+        self.assertEqual(groups.get('renamed'), group)
+        user = User.objects.get(pk=self.user.pk)
+        authors.get('HasNoName')
+        user.first_name = 'Другое'
+        user.save()
+        self.assertEqual(authors.get('HasNoName').first_name, 'Другое')
+        group.delete()
+        self.assertIsNone(groups.get('renamed'))
+
+    def test_profile_skips_user_lookup(self):
+        """Страница профиля берёт автора из кэша."""
+        url = reverse('posts:profile', kwargs={'username': 'HasNoName'})
+        client = Client()
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.context['author'], self.user)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if '"auth_user"."username" = ' in query['sql']
+        ])
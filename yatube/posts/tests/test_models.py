@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -28,3 +29,75 @@ class PostModelTest(TestCase):
         group_name = str(PostModelTest.group)
         self.assertEqual(post_name, PostModelTest.post.text[:15])
         self.assertEqual(group_name, PostModelTest.post.group.title)
+
+    def test_save_increments_version(self):
+        """Сохранение поста увеличивает версию и дату изменения."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        self.assertEqual(post.version, 1)
+        updated = post.updated
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(post.version, 2)
+        self.assertGreater(post.updated, updated)
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+
+    def test_save_does_not_read_version_back(self):
+        """Сохранение — один UPDATE, копия объекта начинает с версии 1."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        with self.assertNumQueries(1):
+            post.save()
+        self.assertEqual(post.version, 2)
+        post.pk = None
+        post.save()
+        self.assertEqual(post.version, 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).version, 1)
+
+    def test_save_with_explicit_pk(self):
+        """Объект с явным pk обновляет строку или вставляет её с версии 1."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        post.save()
+        Post(pk=post.pk, author=self.user, text='Из фикстуры',
+             created=post.created).save()
+        self.assertEqual(Post.objects.get(pk=post.pk).version, 3)
+        new = Post(pk=post.pk + 100, author=self.user, text='Новый')
+        new.save()
+        self.assertEqual(new.version, 1)
+        self.assertEqual(Post.objects.get(pk=new.pk).version, 1)
+
+    def test_save_of_deleted_row_is_a_conflict(self):
+        """Удалённая строка не вставляется заново при сохранении."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        Post.objects.filter(pk=post.pk).delete()
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            post.save()
+        self.assertEqual(post.version, 1)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_queryset_update_increments_version(self):
+        """QuerySet.update тоже увеличивает версию."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        self.user.posts.filter(pk=post.pk).update(group=None)
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+        self.assertGreater(post.updated, post.created)
+
+    def test_comment_replies_get_materialized_path(self):
+        """Ответы получают путь предков, ветку и глубину."""
+        root = Comment.objects.create(
+            author=self.user, post=self.post, text='Корень')
+        reply = Comment.objects.create(
+            author=self.user, post=self.post, text='Ответ', parent=root)
+        nested = Comment.objects.create(
+            author=self.user, post=self.post, text='Ответ', parent=reply)
+        sibling = Comment.objects.create(
+            author=self.user, post=self.post, text='Ответ', parent=root)
+        nested.refresh_from_db()
+        self.assertEqual(root.thread_id, root.id)
+        self.assertEqual(nested.thread_id, root.id)
+        self.assertEqual(nested.depth, 2)
+        self.assertTrue(nested.path.startswith(reply.path))
+        self.assertEqual(list(root.subtree()), [reply, nested, sibling])
+        self.assertEqual(list(reply.subtree()), [nested])
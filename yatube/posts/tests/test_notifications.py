@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.jobs import run_pending
+from core.models import Job
+from posts.models import Follow, Notification, NotificationFanout, Post
+from posts.notifications import fanout, fanout_chunk, send_digests
+
+User = get_user_model()
+
+
+class NotificationsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.followers = [
+            User.objects.create_user(
+                username=f'follower{i}', email=f'follower{i}@example.com')
+            for i in range(3)
+        ]
+        for follower in cls.followers:
+            Follow.objects.create(user=follower, author=cls.author)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def create_post(self):
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        return Post.objects.get(text='Новый пост')
+
+    def test_post_create_only_schedules_fanout(self):
+        """Создание поста не рассылает уведомления в запросе."""
+        post = self.create_post()
+        self.assertTrue(NotificationFanout.objects.filter(post=post).exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_fanout_is_chunked_and_resumable(self):
+        """Рассылка идёт порциями и продолжается с последней подписки."""
+        post = self.create_post()
+        task = NotificationFanout.objects.get(post=post)
+        self.assertEqual(fanout_chunk(task, chunk_size=2), 2)
+        self.assertEqual(fanout(chunk_size=2), 1)
+        self.assertFalse(NotificationFanout.objects.exists())
+        self.assertEqual(
+            set(Notification.objects.values_list('user', flat=True)),
+            {follower.id for follower in self.followers},
+        )
+
+    def test_post_create_queues_one_fanout_job(self):
+        """Рассылку поста запускает одна задача, не периодическая."""
+        post = self.create_post()
+        self.assertEqual(
+            Job.objects.filter(name='posts.jobs.fanout_post').count(), 1)
+        self.assertNotIn('posts.jobs.fanout', settings.JOB_SCHEDULE)
+        run_pending()
+        self.assertFalse(NotificationFanout.objects.filter(post=post).exists())
+        self.assertEqual(Notification.objects.filter(post=post).count(), 3)
+
+    def test_claimed_chunk_is_not_fanned_out_twice(self):
+        """Порцию, уже забранную другим процессом, второй раз не раздают."""
+        post = self.create_post()
+        task = NotificationFanout.objects.get(post=post)
+        stale = NotificationFanout.objects.get(post=post)
+        self.assertEqual(fanout_chunk(task, chunk_size=2), 2)
+        self.assertEqual(fanout_chunk(stale, chunk_size=2), 0)
+        self.assertEqual(stale.last_follow_id, task.last_follow_id)
+        self.assertEqual(fanout_chunk(stale, chunk_size=2), 1)
+        self.assertIsNone(stale.pk)
+        self.assertEqual(fanout_chunk(task, chunk_size=2), 0)
+        self.assertIsNone(task.pk)
+        self.assertEqual(Notification.objects.filter(post=post).count(), 3)
+
+    def test_notifications_page_and_digest(self):
+        """Уведомления видны на странице и уходят одним дайджестом."""
+        self.create_post()
+        fanout()
+        client = Client()
+        client.force_login(self.followers[0])
+        response = client.get(reverse('posts:notifications'))
+        self.assertContains(response, 'Новый пост')
+        self.assertFalse(
+            self.followers[0].notifications.filter(read=False).exists())
+        self.assertEqual(send_digests(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Новый пост', mail.outbox[0].body)
+        self.assertEqual(send_digests(), 0)
+
+    def test_digest_marks_only_notifications_it_read(self):
+        """Уведомление, созданное во время рассылки, уйдёт в следующий раз."""
+        first = self.create_post()
+        fanout()
+        second = Post.objects.create(author=self.author, text='Второй пост')
+        connection = get_connection()
+        send_messages = connection.send_messages
+
+        def send_and_notify(messages):
+            Notification.objects.create(user=self.followers[0], post=second)
+            return send_messages(messages)
+
+        connection.send_messages = send_and_notify
+        with mock.patch('posts.notifications.get_connection',
+                        return_value=connection):
+            self.assertEqual(send_digests(), 3)
+        self.assertFalse(Notification.objects.filter(
+            post=first, emailed=False).exists())
+        self.assertTrue(Notification.objects.filter(
+            post=second, emailed=False).exists())
+        self.assertEqual(send_digests(), 1)
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, PostRank
+from posts.ranking import update_ranking
+
+User = get_user_model()
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.quiet_post = Post.objects.create(
+            author=cls.user, text='Тихий пост')
+        cls.popular_post = Post.objects.create(
+            author=cls.user, text='Обсуждаемый пост')
+        Post.objects.filter(pk=cls.popular_post.pk).update(views=50)
+        Post.objects.filter(pk=cls.quiet_post.pk).update(
+            created=cls.popular_post.created)
+
+    def test_rank_orders_by_weight(self):
+        """Пост с просмотрами и комментариями выше в рейтинге."""
+        Comment.objects.create(
+            author=self.user, post=self.popular_post, text='Комментарий')
+        self.assertEqual(update_ranking(), 2)
+        self.assertEqual(
+            [rank.post_id for rank in PostRank.objects.all()],
+            [self.popular_post.id, self.quiet_post.id],
+        )
+
+    def test_incremental_update_touches_changed_posts(self):
+        """Повторный расчёт пересчитывает только изменившиеся посты."""
+        update_ranking()
+        self.assertEqual(update_ranking(), 0)
+        Comment.objects.create(
+            author=self.user, post=self.quiet_post, text='Комментарий')
+        self.assertEqual(update_ranking(), 1)
+        Post.objects.filter(pk=self.popular_post.pk).update(views=60)
+        self.assertEqual(update_ranking(), 1)
+        self.assertEqual(update_ranking(full=True), 2)
+
+    def test_popular_page_shows_ranked_posts(self):
+        """Страница популярного выводит посты в порядке рейтинга."""
+        update_ranking()
+        response = Client().get(reverse('posts:popular'))
+        self.assertTemplateUsed(response, 'posts/popular.html')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.popular_post, self.quiet_post],
+        )
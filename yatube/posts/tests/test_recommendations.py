@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.jobs import run_pending
+from posts.models import Follow, FollowSuggestion
+from posts.recommendations import FollowGraph, rebuild_suggestions
+
+User = get_user_model()
+
+
+class FollowSuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.author, cls.friend, cls.neighbour, cls.other = (
+            User.objects.create_user(username=username)
+            for username in ('reader', 'author', 'friend', 'neighbour',
+                             'other')
+        )
+        for user, author in (
+            (cls.reader, cls.author),
+            (cls.author, cls.friend),
+            (cls.neighbour, cls.author),
+            (cls.neighbour, cls.other),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def suggested(self, user):
+        return list(FollowSuggestion.objects.filter(user=user).values_list(
+            'suggested__username', flat=True))
+
+    def test_graph_scores_friends_and_co_follows(self):
+        """Друзья друзей и подписки похожих читателей попадают в выдачу."""
+        graph = FollowGraph(Follow.objects.values_list('user', 'author'))
+        suggestions = dict(
+            (candidate, score)
+            for score, candidate in graph.suggest(self.reader.id)
+        )
+        self.assertEqual(set(suggestions), {self.friend.id, self.other.id})
+        self.assertNotIn(self.author.id, suggestions)
+
+    def test_follow_refreshes_stored_suggestions(self):
+        """Подписка убирает автора из рекомендаций фоновой задачей."""
+        rebuild_suggestions()
+        self.assertIn('friend', self.suggested(self.reader))
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'friend'}))
+        run_pending()
+        self.assertNotIn('friend', self.suggested(self.reader))
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'friend'}))
+        run_pending()
+        self.assertIn('friend', self.suggested(self.reader))
+
+    def test_profile_shows_own_suggestions(self):
+        """Рекомендации видны на собственной странице профиля."""
+        rebuild_suggestions()
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'reader'}))
+        self.assertEqual(
+            [s.suggested for s in response.context['suggestions']],
+            [self.other, self.friend],
+        )
+
+    @mock.patch('posts.recommendations.STORE_BATCH_SIZE', 1)
+    def test_rebuild_stores_in_batches(self):
+        """Пачки пользователей дают те же рекомендации, что и одна."""
+        FollowSuggestion.objects.create(
+            user=self.friend, suggested=self.other, score=1)
+        rebuild_suggestions()
+        self.assertEqual(self.suggested(self.reader), ['other', 'friend'])
+        self.assertEqual(self.suggested(self.friend), [])
+
+    @mock.patch('posts.recommendations.MAX_CO_FOLLOWERS', 1)
+    def test_graph_around_user_caps_co_followers(self):
+        """Из подписчиков авторов пользователя читаются только последние."""
+        late = User.objects.create_user(username='late')
+        Follow.objects.create(user=late, author=self.author)
+        graph = FollowGraph.around([self.reader.id])
+        self.assertIn(late.id, graph.following)
+        self.assertNotIn(self.neighbour.id, graph.following)
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.jobs import run_pending
+from posts.models import Post, RelatedPost
+from posts.related import rebuild_related
+
+User = get_user_model()
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.python_post = Post.objects.create(
+            author=cls.user, text='Питон и джанго: шаблоны и модели')
+        cls.django_post = Post.objects.create(
+            author=cls.user, text='Модели джанго и миграции')
+        cls.garden_post = Post.objects.create(
+            author=cls.user, text='Огород весной: рассада томатов')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def related(self, post):
+        return [link.related for link in post.related_links.all()]
+
+    def test_rebuild_links_posts_with_common_words(self):
+        """Посты с общими словами становятся соседями друг друга."""
+        self.assertEqual(rebuild_related(), 3)
+        self.assertEqual(self.related(self.python_post), [self.django_post])
+        self.assertEqual(self.related(self.garden_post), [])
+
+    @mock.patch('posts.related.BATCH_SIZE', 1)
+    def test_rebuild_in_batches_replaces_old_links(self):
+        """Пересчёт пачками даёт те же соседи и убирает устаревшие."""
+        RelatedPost.objects.create(
+            post=self.garden_post, related=self.python_post, score=1)
+        self.assertEqual(rebuild_related(), 3)
+        self.assertEqual(self.related(self.python_post), [self.django_post])
+        self.assertEqual(self.related(self.django_post), [self.python_post])
+        self.assertEqual(self.related(self.garden_post), [])
+
+    @mock.patch('posts.related.MAX_POSTINGS', 2)
+    def test_common_word_limit_is_the_same_for_new_posts(self):
+        """Слово, которого нет в поиске при пересчёте, не ищется и сразу."""
+        rebuild_related()
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Джанго и рассада'},
+        )
+        run_pending()
+        new_post = Post.objects.get(text='Джанго и рассада')
+        self.assertEqual(self.related(new_post), [self.garden_post])
+
+    def test_new_post_is_indexed_by_job(self):
+        """Новый пост получает соседей и попадает в их списки."""
+        rebuild_related()
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Томатов много, рассада выросла'},
+        )
+        run_pending()
+        new_post = Post.objects.get(text__startswith='Томатов')
+        self.assertEqual(self.related(new_post), [self.garden_post])
+        self.assertIn(new_post, self.related(self.garden_post))
+
+    def test_post_detail_shows_related_posts(self):
+        """Страница поста выводит похожие посты одним запросом."""
+        RelatedPost.objects.create(
+            post=self.python_post, related=self.django_post, score=0.5)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.python_post.id}))
+        self.assertEqual(
+            [link.related for link in response.context['related_posts']],
+            [self.django_post],
+        )
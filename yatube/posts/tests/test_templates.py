@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.templatetags.post_cards import card_cache_key
+
+User = get_user_model()
+
+
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group-slug',
+            description='Описание тестовой группы'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый текст {i}', group=cls.group)
+            for i in range(3)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_feed_renders_card_per_post(self):
+        """Лента рендерит карточку на каждый пост и разделители между ними."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        content = response.content.decode()
+        self.assertEqual(content.count('<article>'), 3)
+        self.assertEqual(content.count('<hr>'), 2)
+
+    def test_cards_are_cached_by_post_version(self):
+        """Карточка кэшируется и перерисовывается после правки поста."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        post = Post.objects.select_related('author', 'group').first()
+        self.guest_client.get(url)
+        self.assertIn('Тестовый текст', cache.get(card_cache_key(post, True)))
+        post.text = 'Исправленный текст'
+        post.save()
+        self.assertIsNone(cache.get(card_cache_key(post, True)))
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_bench_render_reports_every_feed(self):
+        """Бенчмарк печатает время рендера каждой ленты."""
+        out = StringIO()
+        call_command('bench_render', repeat=2, stdout=out)
+        for template in ('index', 'follow', 'group_list', 'profile'):
+            with self.subTest(template=template):
+                self.assertIn(f'posts/{template}.html', out.getvalue())
+
+    def test_bench_render_fails_over_budget(self):
+        """Бенчмарк падает, если медиана превышает бюджет."""
+        with self.assertRaises(CommandError):
+            call_command('bench_render', repeat=2, budget=0, stdout=StringIO())
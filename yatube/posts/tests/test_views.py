@@ -1,6 +1,7 @@
 import shutil
 import tempfile
 from itertools import islice, chain
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
@@ -9,8 +10,11 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 
-from posts.models import Post, Group, Follow
+from posts.models import Post, Group, Follow, Comment
 from posts.forms import PostForm
+from core.pagination import encode_cursor
+from core.counters import view_counter
+from users.models import ProfileStats
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -309,3 +313,251 @@ class TaskPagesTests_2(TestCase):
                 self.assertEqual(len(response.context['page_obj']), 10)
                 response = self.authorized_client.get(reverse_ + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), numbers)
+
+
+class NewPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.author = User.objects.create_user(username='AnotherAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group-slug',
+            description='Описание тестовой группы'
+        )
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Старый пост', group=cls.group)
+        cls.cursor = encode_cursor(cls.old_post)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feeds(self):
+        return (
+            reverse('posts:index_new'),
+            reverse('posts:group_list_new', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_new',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index_new'),
+        )
+
+    def test_no_new_posts_returns_no_content(self):
+        """Без новых постов лента отвечает пустым 204."""
+        for url in self.feeds():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, {'cursor': self.cursor})
+                self.assertEqual(response.status_code, 204)
+                self.assertEqual(response.content, b'')
+
+    def test_new_posts_are_returned_after_cursor(self):
+        """Новые посты приходят карточками вместе с новым курсором."""
+        new_post = Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group)
+        for url in self.feeds():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, {'cursor': self.cursor})
+                data = response.json()
+                self.assertIn('Новый пост', data['html'])
+                self.assertNotIn('Старый пост', data['html'])
+                self.assertEqual(data['cursor'], encode_cursor(new_post))
+                self.assertFalse(data['has_more'])
+
+    def test_post_created_in_same_microsecond_is_not_lost(self):
+        """Пост с тем же created, что у курсора, отличается по id."""
+        twin = Post.objects.create(author=self.author, text='Близнец')
+        Post.objects.filter(pk=twin.pk).update(created=self.old_post.created)
+        data = self.authorized_client.get(
+            reverse('posts:index_new'), {'cursor': self.cursor}).json()
+        self.assertIn('Близнец', data['html'])
+        self.assertEqual(data['cursor'],
+                         f'{self.cursor.split(":")[0]}:{twin.pk}')
+
+    def test_cached_feed_keeps_cursor_of_cached_posts(self):
+        """Курсор берётся из того же кэша, что и карточки постов."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
+        self.assertContains(response, f'data-cursor="{self.cursor}"')
+
+    def test_invalid_cursor_is_rejected(self):
+        """Повреждённый курсор отклоняется."""
+        response = self.authorized_client.get(
+            reverse('posts:index_new'), {'cursor': 'вчера'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feed_page_embeds_cursor(self):
+        """Первая страница ленты отдаёт курсор самого нового поста."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'data-cursor="{self.cursor}"')
+
+
+class PostCommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+        Comment.objects.bulk_create(
+            Comment(author=cls.user, post=cls.post, text=f'Комментарий {i}')
+            for i in range(25)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_embeds_first_page_of_comments(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertTrue(comments.has_next)
+        self.assertContains(response, 'id="comments-more"')
+
+    def test_next_pages_are_loaded_by_cursor(self):
+        """Остальные комментарии подгружаются по курсору без повторов."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        first_page = response.context['comments']
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': first_page.next_cursor},
+        )
+        data = response.json()
+        self.assertIsNone(data['cursor'])
+        shown = {comment.text for comment in first_page}
+        shown.update(
+            f'Комментарий {i}' for i in range(25)
+            if f'Комментарий {i}\n' in data['html']
+        )
+        self.assertEqual(len(shown), 25)
+        self.assertEqual(data['html'].count('class="media mb-4"'), 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        """Повреждённый курсор отклоняется."""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': 'мусор'},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_THRESHOLD=1000)
+class ThreadedCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+        cls.root = Comment.objects.create(
+            author=cls.user, post=cls.post, text='Корень')
+        parent = cls.root
+        cls.branch = []
+        for depth in range(1, 6):
+            parent = Comment.objects.create(
+                author=cls.user, post=cls.post, text=f'Глубина {depth}',
+                parent=parent)
+            cls.branch.append(parent)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_detail_renders_threads_with_collapsed_branches(self):
+        """Ветка выводится в порядке обхода, глубокие ответы свёрнуты."""
+        view_counter.flush()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        with self.assertNumQueries(9):
+            response = self.authorized_client.get(url)
+        comments = response.context['comments'].object_list
+        self.assertEqual(comments, [self.root] + self.branch[:3])
+        self.assertEqual(comments[-1].collapsed_replies, 1)
+        self.assertContains(response, 'Показать ответы (1)')
+
+    def test_live_comments_start_after_the_newest_reply(self):
+        """Поток новых комментариев начинается после самого нового ответа."""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, f'data-after="{self.branch[-1].id}"')
+
+    def test_comment_thread_returns_collapsed_subtree(self):
+        """Свёрнутое поддерево подгружается целиком."""
+        response = self.authorized_client.get(reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.id, 'comment_id': self.branch[2].id},
+        ))
+        html = response.json()['html']
+        self.assertIn('Глубина 4', html)
+        self.assertIn('Глубина 5', html)
+        self.assertNotIn('Глубина 3', html)
+
+    @mock.patch('posts.comments.REPLIES_PER_THREAD', 2)
+    def test_long_thread_is_cut_and_continued(self):
+        """Ветка показывает первые ответы, остальные приходят порциями."""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments'].object_list
+        self.assertEqual(comments, [self.root] + self.branch[:2])
+        after = comments[-1].more_replies_after
+        self.assertEqual(after, self.branch[1].path)
+        self.assertContains(response, 'Показать ещё ответы')
+        url = reverse('posts:comment_thread', kwargs={
+            'post_id': self.post.id, 'comment_id': self.root.id})
+        html = self.authorized_client.get(url, {'after': after}).json()['html']
+        self.assertIn('Глубина 3', html)
+        self.assertIn('Глубина 4', html)
+        self.assertNotIn('Глубина 2', html)
+        self.assertNotIn('Глубина 5', html)
+        self.assertIn(f'after={self.branch[3].path}', html)
+
+    def test_add_comment_replies_to_parent(self):
+        """Комментарий с parent становится ответом в той же ветке."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Новый ответ', 'parent': self.root.id},
+        )
+        reply = Comment.objects.get(text='Новый ответ')
+        self.assertEqual(reply.parent, self.root)
+        self.assertEqual(reply.thread_id, self.root.id)
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_THRESHOLD=3)
+class ViewCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        view_counter.flush()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+
+    def setUp(self):
+        self.guest_client = Client()
+        view_counter.flush()
+
+    def test_post_views_are_buffered_and_flushed_in_batch(self):
+        """Просмотры копятся в памяти и пишутся в базу пачкой."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        for expected in (1, 2):
+            response = self.guest_client.get(url)
+            self.assertEqual(response.context['views'], expected)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.guest_client.get(url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+        self.assertEqual(self.post.version, 1)
+
+    def test_profile_views_create_stats_row(self):
+        """Счётчик профиля создаёт строку статистики при записи."""
+        url = reverse('posts:profile', kwargs={'username': self.user.username})
+        for _ in range(3):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['views'], 3)
+        self.assertEqual(ProfileStats.objects.get(user=self.user).views, 3)
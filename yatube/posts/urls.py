@@ -6,14 +6,31 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('new/', views.index_new, name='index_new'),
+    path('popular/', views.popular, name='popular'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/new/', views.group_posts_new,
+         name='group_list_new'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/new/', views.profile_new,
+         name='profile_new'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/thread/',
+         views.comment_thread, name='comment_thread'),
+    path('posts/<int:post_id>/comments/stream/', views.comments_stream,
+         name='comments_stream'),
+    path('posts/<int:post_id>/comments/poll/', views.comments_poll,
+         name='comments_poll'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/new/', views.follow_index_new, name='follow_index_new'),
+    path('notifications/', views.notifications, name='notifications'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
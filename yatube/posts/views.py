@@ -1,13 +1,74 @@
+from http import HTTPStatus
+
 from django.core.paginator import Paginator
+from django.db.models import F, Max, Q
+from django.http import (HttpResponse, HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 
-from .models import Post, Group, Follow
+from core.counters import view_counter
+from core.pagination import decode_cursor, encode_cursor
+from core.pubsub import get_broker
+from core.ratelimit import ratelimit
+from . import jobs
+from .comments import subtree_page, thread_page
+from .lookups import authors, groups
+from .notifications import schedule_fanout
+from users.models import ProfileStats
+from .models import Post, Group, Follow, Comment, Notification
+from .related import RELATED_PER_POST
 from .forms import PostForm, CommentForm
+from .live import (LONG_POLL_TIMEOUT, comments_channel, comments_event_stream,
+                   missed_comments, publish_comment)
 
 
 NUM_OF_POSTS: int = 10
+NUM_OF_GROUPS: int = 20
+COMMENTS_PER_PAGE: int = 20
+
+
+def following_ids(request) -> frozenset:
+    """id авторов, на которых подписан пользователь, один раз за запрос."""
+    if not hasattr(request, '_following_ids'):
+        ids = ()
+        if request.user.is_authenticated:
+            ids = Follow.objects.filter(user=request.user).values_list(
+                'author_id', flat=True)
+        request._following_ids = frozenset(ids)
+    return request._following_ids
+
+
+def new_posts_response(request, post_list, **context):
+    """Посты ленты, опубликованные после курсора `?cursor=`.
+
+    Курсор — позиция `(created, id)` самого нового показанного поста, см.
+    core.pagination: посты, созданные в одну микросекунду, различаются
+    по id. Отдаёт не больше страницы самых старых из новых постов, чтобы
+    клиент мог догнать ленту несколькими запросами. Если новых постов
+    нет, отвечает пустым 204 без рендеринга.
+    """
+    position = decode_cursor(request.GET.get('cursor'))
+    if position is None:
+        return HttpResponseBadRequest()
+    created, pk = position
+    posts = list(post_list.filter(
+        Q(created__gt=created) | Q(created=created, pk__gt=pk),
+    ).select_related('author', 'group').order_by(
+        'created', 'pk')[:NUM_OF_POSTS + 1])
+    if not posts:
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    has_more = len(posts) > NUM_OF_POSTS
+    posts = posts[:NUM_OF_POSTS]
+    context['posts'] = posts[::-1]
+    return JsonResponse({
+        'cursor': encode_cursor(posts[-1]),
+        'has_more': has_more,
+        'html': render_to_string(
+            'posts/includes/new_posts.html', context, request),
+    })
 
 
 def index(request):
@@ -22,8 +83,25 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+def index_new(request):
+    return new_posts_response(request, Post.objects.all())
+
+
+def popular(request):
+    """Посты по рейтингу, который пересчитывает команда rank_posts."""
+    post_list = Post.objects.filter(rank__isnull=False).select_related(
+        'author', 'group').order_by('-rank__score')
+    paginator = Paginator(post_list, NUM_OF_POSTS)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = groups.get_or_404(slug)
     post_list = (group.posts.select_related('author', 'group').all())
     paginator = Paginator(post_list, NUM_OF_POSTS)
     page_number = request.GET.get('page')
@@ -35,37 +113,114 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+def group_index(request):
+    group_list = Group.objects.select_related('stats').order_by(
+        F('stats__last_post').desc(nulls_last=True), 'title')
+    paginator = Paginator(group_list, NUM_OF_GROUPS)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+def group_posts_new(request, slug):
+    group = groups.get_or_404(slug)
+    return new_posts_response(request, Post.objects.filter(group=group))
+
+
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     post_list = (author.posts.select_related('author', 'group').all())
-    following = author.following.filter(user=request.user.id).exists()
+    following = author.id in following_ids(request)
     paginator = Paginator(post_list, NUM_OF_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    view_counter.incr(ProfileStats, author.id)
+    views = ProfileStats.objects.filter(user=author).values_list(
+        'views', flat=True).first() or 0
+    suggestions = []
+    if author == request.user:
+        suggestions = author.follow_suggestions.select_related('suggested')
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'views': views + view_counter.get_pending(ProfileStats, author.id),
+        'suggestions': suggestions,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_new(request, username):
+    return new_posts_response(
+        request,
+        Post.objects.filter(author__username=username),
+        author=username,
+    )
+
+
 def post_detail(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    view_counter.incr(Post, post.id)
+    comments = thread_page(post, None, COMMENTS_PER_PAGE)
     author = get_object_or_404(User, username=post.author)
     count = author.posts.count()
     form = CommentForm(request.POST or None)
+    reply_to = None
+    reply_to_id = parse_comment_id(request.GET.get('reply_to'))
+    if reply_to_id is not None:
+        reply_to = post.comments.select_related('author').filter(
+            id=reply_to_id).first()
     context = {
         'post': post,
         'count': count,
         'comments': comments,
+        # Новые комментарии в реальном времени — после самого нового
+        # из всех, а не из корней первой страницы: у ответов в старых
+        # ветках id больше.
+        'last_comment_id': post.comments.aggregate(
+            last=Max('id'))['last'] or 0,
         'form': form,
+        'reply_to': reply_to,
+        'views': post.views + view_counter.get_pending(Post, post.id),
+        'related_posts': post.related_links.select_related(
+            'related__author')[:RELATED_PER_POST],
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев после курсора `?cursor=`."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    position = decode_cursor(request.GET.get('cursor'))
+    if position is None:
+        return HttpResponseBadRequest()
+    comments = thread_page(post, position, COMMENTS_PER_PAGE)
+    return JsonResponse({
+        'cursor': comments.next_cursor,
+        'html': render_to_string(
+            'posts/includes/comments.html', {'comments': comments}, request),
+    })
+
+
+def comment_thread(request, post_id, comment_id):
+    """Ответы на комментарий одним запросом поддерева, порцией.
+
+    `?after=<путь>` продолжает с ответа после этого пути.
+    """
+    comment = get_object_or_404(
+        Comment.objects.only('thread', 'path'), post=post_id, id=comment_id)
+    replies = subtree_page(comment, request.GET.get('after'))
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comments.html', {'comments': replies}, request),
+    })
+
+
 @login_required
+@ratelimit('post_create')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -76,6 +231,11 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_fanout(post)
+        jobs.index_post.delay(post.id)
+        jobs.fanout_post.delay(post.id)
+        if post.image:
+            jobs.warm_thumbnails.delay(post.id)
         return redirect('posts:profile', post.author.username)
     context = {
         'form': form
@@ -95,6 +255,10 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'text' in form.changed_data:
+            jobs.index_post.delay(post.id)
+        if 'image' in form.changed_data and post.image:
+            jobs.warm_thumbnails.delay(post.id)
         return redirect('posts:post_detail', post_id=post.id)
     context = {
         'form': form,
@@ -104,6 +268,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
     # Получите пост и сохраните его в переменную post.
     form = CommentForm(request.POST or None)
@@ -112,14 +277,57 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent_id = parse_comment_id(request.POST.get('parent'))
+        if parent_id is not None:
+            comment.parent = post.comments.filter(id=parent_id).first()
         comment.save()
+        publish_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def parse_comment_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def comments_stream(request, post_id):
+    """Server-Sent Events с новыми комментариями к посту."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    after = parse_comment_id(
+        request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get('after'))
+    response = StreamingHttpResponse(
+        comments_event_stream(post, after),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Иначе nginx буферизует поток целиком.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def comments_poll(request, post_id):
+    """Long-poll для браузеров без EventSource: `?after=<id комментария>`."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    after = parse_comment_id(request.GET.get('after'))
+    if after is None:
+        return HttpResponseBadRequest()
+    with get_broker().subscribe(comments_channel(post.id)) as subscription:
+        messages = missed_comments(post, after)
+        if not messages:
+            message = subscription.get(LONG_POLL_TIMEOUT)
+            if message is not None:
+                messages.append(message)
+    if not messages:
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    return JsonResponse({'comments': messages})
+
+
 @login_required
 def follow_index(request):
     post_list = (Post.objects.filter(
-        author__following__user=request.user)).select_related(
+        author__in=following_ids(request))).select_related(
             'author', 'group')
     paginator = Paginator(post_list, NUM_OF_POSTS)
     page_number = request.GET.get('page')
@@ -132,21 +340,47 @@ def follow_index(request):
 
 
 @login_required
+def notifications(request):
+    """Уведомления о новых постах, показанные отмечаются прочитанными."""
+    notification_list = request.user.notifications.select_related(
+        'post__author', 'post__group')
+    paginator = Paginator(notification_list, NUM_OF_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'page_obj': page_obj,
+    }
+    response = render(request, 'posts/notifications.html', context)
+    Notification.objects.filter(
+        pk__in=[notification.pk for notification in page_obj],
+        read=False,
+    ).update(read=True)
+    return response
+
+
+@login_required
+def follow_index_new(request):
+    return new_posts_response(
+        request, Post.objects.filter(author__in=following_ids(request)))
+
+
+@login_required
+@ratelimit('profile_follow', methods=None)
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    new_follow = not Follow.objects.filter(
-        author=author, user=request.user).exists()
+    author = authors.get_or_404(username)
+    new_follow = author.id not in following_ids(request)
     if author != request.user and new_follow:
         sub = Follow()
         sub.author = author
         sub.user = request.user
         sub.save()
+        jobs.refresh_suggestions.delay(request.user.id)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     sub = Follow.objects.filter(author=author, user=request.user)
-    sub.delete()
+    if sub.delete()[0]:
+        jobs.refresh_suggestions.delay(request.user.id)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand, CommandError
+
+from core.hashers import PasswordHashingBusy
+
+PASSWORD = 'correct horse battery staple'
+
+
+def measure(hasher, encoded, seconds, threads):
+    """Число проверок пароля в секунду в threads потоках."""
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            try:
+                hasher.verify(PASSWORD, encoded)
+            except PasswordHashingBusy:
+                continue
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        counts = [executor.submit(worker) for _ in range(threads)]
+        total = sum(future.result() for future in counts)
+    return total / (time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    help = 'Измеряет, сколько входов в секунду выдерживает хэшер паролей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3,
+                            help='Длительность замера каждого хэшера.')
+        parser.add_argument('--threads', type=int, default=os.cpu_count(),
+                            help='Потоков в замере параллельных входов.')
+        parser.add_argument('--all', action='store_true',
+                            help='Замерить все хэшеры, а не только основной.')
+        parser.add_argument('--min-rate', type=float,
+                            help='Минимум входов в секунду на ядро.')
+
+    def handle(self, *args, **options):
+        hashers = get_hashers()
+        if not options['all']:
+            hashers = hashers[:1]
+        slowest = None
+        for hasher in hashers:
+            try:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            except ValueError as error:
+                self.stdout.write(f'{hasher.algorithm}: пропущен ({error})')
+                continue
+            per_core = measure(hasher, encoded, options['seconds'], 1)
+            parallel = measure(
+                hasher, encoded, options['seconds'], options['threads'])
+            slowest = per_core if slowest is None else min(slowest, per_core)
+            self.stdout.write(
+                f'{hasher.algorithm}: {per_core:.1f} входов/с на ядро, '
+                f'{parallel:.1f} входов/с в {options["threads"]} потоках'
+            )
+        min_rate = options['min_rate']
+        if min_rate is not None and slowest is not None and slowest < min_rate:
+            raise CommandError(
+                f'{slowest:.1f} входов/с на ядро меньше минимума {min_rate}')
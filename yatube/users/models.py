@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class ProfileStats(models.Model):
+    """Счётчики профиля пользователя."""
+    # Строка создаётся при первой записи счётчика.
+    counter_autocreate = True
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    views = models.PositiveIntegerField(
+        verbose_name='Просмотры профиля',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Статистика профиля'
+        verbose_name_plural = 'Статистика профилей'
@@ -11,31 +11,61 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-# Quick-start development settings - unsuitable for production
+def env_bool(name, default) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default) -> int:
+    return int(os.environ.get(name, default))
+
+
+def env_list(name, default) -> list:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Значения по умолчанию годятся только для разработки. В продакшене их
+# задают переменные окружения, см. yatube/settings_production.py.
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'kz6agh=7^(+4t#(9%z9%j1*qzqj2v9+zjq*g+yim+noc$gw&o3'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'kz6agh=7^(+4t#(9%z9%j1*qzqj2v9+zjq*g+yim+noc$gw&o3')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DJANGO_DEBUG', True)
 
-ALLOWED_HOSTS = [
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [
     'localhost',
     '127.0.0.1',
     '[::1]',
     'testserver',
-]
+])
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# Пользователь сессии читается из кэша, а не из auth_user на каждый запрос.
+AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+
+# Сессии читаются из кэша и пишутся в базу только при изменении.
+# 'django.contrib.sessions.backends.signed_cookies' хранит сессию
+# в подписанной cookie и совсем не обращается к хранилищу.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 
 # Application definition
 
@@ -54,24 +84,40 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.tracing.TracingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.static.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.hashing.PasswordHashingBusyMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.tracing.ViewSpanMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Без DEBUG шаблоны компилируются один раз на процесс.
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TracingDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'debug': DEBUG,
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -86,8 +132,18 @@ TEMPLATES = [
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
-
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Прогревать процесс при загрузке wsgi.py, см. core.warmup. Полезно
+# вместе с preload_app в gunicorn.
+WSGI_WARMUP = False
+
+# Письма ставятся в очередь и отправляются командой send_queued_mail
+# через EMAIL_QUEUE_BACKEND, см. core.mail.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Пауза перед первой повторной попыткой, секунды; дальше удваивается.
+EMAIL_QUEUE_RETRY_DELAY = 60
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -103,6 +159,69 @@ DATABASES = {
 }
 
 
+# Фоновые задачи
+# Выполняются командой runworker, см. core.jobs.
+
+JOB_MAX_ATTEMPTS = 3
+# Пауза перед первой повторной попыткой, секунды; дальше удваивается.
+JOB_RETRY_DELAY = 30
+# Раз во столько секунд процесс отмечает в выполняемой задаче, что жив.
+JOB_HEARTBEAT = 30
+# Задача без такой отметки дольше считается упавшей вместе с процессом.
+JOB_TIMEOUT = 3 * 60
+# Сколько секунд хранить выполненные задачи.
+JOB_KEEP = 7 * 24 * 60 * 60
+# Периодические задачи: функция и интервал запуска в секундах.
+JOB_SCHEDULE = {
+    'core.mail.send_queued': 30,
+    'posts.jobs.update_ranking': 5 * 60,
+    'posts.jobs.refresh_group_stats': 10 * 60,
+    'posts.jobs.rebuild_related': 24 * 60 * 60,
+    'posts.jobs.rebuild_suggestions': 24 * 60 * 60,
+    'posts.jobs.send_digests': 24 * 60 * 60,
+}
+
+
+# Лимиты запросов
+# К пишущим страницам, по пользователю или IP-адресу, см. core.ratelimit.
+
+# Страница без лимита в словаре не ограничена.
+RATELIMITS = {
+    'post_create': '10/m',
+    'add_comment': '30/m',
+    'profile_follow': '60/m',
+    'signup': '5/h',
+}
+
+# Адреса и сети прокси, которым верят в X-Forwarded-For, см. core.proxies.
+TRUSTED_PROXIES = []
+
+
+# Хэширование паролей
+# Argon2 — если установлен argon2-cffi, иначе PBKDF2. Хэши, созданные
+# другим хэшером из списка или с другой стоимостью, пересчитываются
+# при входе пользователя.
+
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS = ['core.hashers.Argon2PasswordHasher']
+except ImportError:
+    PASSWORD_HASHERS = []
+PASSWORD_HASHERS += [
+    'core.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 19 * 1024
+PASSWORD_ARGON2_PARALLELISM = 1
+PASSWORD_PBKDF2_ITERATIONS = 150000
+# Хэшей, которые процесс считает одновременно (None — по числу ядер),
+# и сколько секунд запрос ждёт свободного места до ответа 503.
+PASSWORD_HASHING_CONCURRENCY = None
+PASSWORD_HASHING_WAIT = 2
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -141,6 +260,16 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Хэши в именах файлов и сжатые .gz/.br варианты, собранные collectstatic.
+# При DEBUG манифеста ещё нет, поэтому используется обычное хранилище.
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# Раздавать статику из STATIC_ROOT самим Django, без отдельного веб-сервера.
+STATIC_SERVE = False
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
@@ -148,6 +277,46 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
     }
 }
+
+# Метрики для /metrics, см. core.metrics. Каталог общий для всех
+# процессов одного развёртывания. Пустой METRICS_TOKEN отключает
+# страницу, Prometheus передаёт токен в bearer_token.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = ''
+
+THUMBNAIL_BACKEND = 'core.thumbnails.InstrumentedThumbnailBackend'
+
+# Трассировка, см. core.tracing: доля записываемых трасс и файл, в который
+# они дописываются строками OTLP/JSON. Файл больше TRACING_FILE_MAX_BYTES
+# переименовывается в TRACING_FILE.1. Флаг sampled из traceparent
+# учитывается, только если TRACING_TRUST_SAMPLED и запрос пришёл
+# от TRUSTED_PROXIES: прокси должен сам ставить или очищать заголовок.
+TRACING_SAMPLE_RATE = 0.01
+TRACING_FILE = os.path.join(tempfile.gettempdir(), 'yatube-traces.jsonl')
+TRACING_FILE_MAX_BYTES = 100 * 1024 * 1024
+TRACING_TRUST_SAMPLED = False
+TRACING_SERVICE_NAME = 'yatube'
+
+# Профилирование, см. core.profiling. Пустой PROFILING_TOKEN отключает
+# профилирование запросов по заголовку X-Profile. PROFILING_SIGNAL
+# отправляют процессу воркера, а не мастеру gunicorn; сигналы, которыми
+# gunicorn управляет процессами, здесь не годятся.
+PROFILING_TOKEN = ''
+PROFILING_DIR = os.path.join(tempfile.gettempdir(), 'yatube-profiles')
+PROFILING_INTERVAL = 0.005
+PROFILING_SIGNAL = 'SIGPROF'
+PROFILING_SIGNAL_SECONDS = 30
+
+# Доставка событий подписчикам: core.pubsub.LocalBroker для одного процесса,
+# core.pubsub.CacheBroker — через общий кэш для нескольких.
+PUBSUB_BROKER = 'core.pubsub.LocalBroker'
+
+# Счётчики просмотров пишутся в базу пачкой раз в COUNTER_FLUSH_INTERVAL
+# секунд или каждые COUNTER_FLUSH_THRESHOLD просмотров, см. core.counters:
+# столько просмотров может потеряться при аварийной остановке.
+COUNTER_FLUSH_INTERVAL = 10
+COUNTER_FLUSH_THRESHOLD = 100
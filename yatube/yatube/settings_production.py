@@ -0,0 +1,113 @@
+"""Настройки продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Обязательны переменные окружения DJANGO_SECRET_KEY и DJANGO_ALLOWED_HOSTS
+(через запятую), остальные необязательны. DEBUG выключен всегда: с ним
+Django запоминает каждый SQL-запрос в connection.queries, и память
+воркера под нагрузкой растёт. Сервер и число воркеров настраиваются
+в gunicorn.conf.py.
+"""
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+# settings выбирает по DEBUG загрузчик шаблонов и хранилище статики,
+# поэтому DEBUG выключается до импорта.
+os.environ['DJANGO_DEBUG'] = 'false'
+
+from .settings import *  # noqa: E402,F401,F403
+from .settings import (AUTHENTICATION_BACKENDS, DATABASES,  # noqa: E402
+                       MEDIA_ROOT, METRICS_DIR, PROFILING_SIGNAL, STATIC_ROOT,
+                       TRACING_FILE, TRACING_SAMPLE_RATE, env_bool, env_int,
+                       env_list)
+
+for name in ('DJANGO_SECRET_KEY', 'DJANGO_ALLOWED_HOSTS'):
+    if not os.environ.get(name):
+        raise ImproperlyConfigured(f'Не задана переменная окружения {name}')
+
+DATABASES['default']['NAME'] = os.environ.get(
+    'DJANGO_DB_PATH', DATABASES['default']['NAME'])
+# Воркер держит соединение с базой между запросами.
+DATABASES['default']['CONN_MAX_AGE'] = env_int('DJANGO_CONN_MAX_AGE', 60)
+
+# Кэш общий для всех воркеров: в нём пользователь сессии, лимиты запросов
+# и события pubsub. Файловый кэш общий для процессов одного сервера,
+# для нескольких серверов нужен memcached:
+# DJANGO_CACHE_BACKEND=core.cache.InstrumentedPyLibMCCache и
+# DJANGO_CACHE_LOCATION=адрес:порт.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND', 'core.cache.InstrumentedFileBasedCache'),
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'yatube-cache')),
+    }
+}
+if (CACHES['default']['BACKEND'].endswith('LocMemCache')
+        and 'core.backends.CachedModelBackend' in AUTHENTICATION_BACKENDS):
+    # Воркер, не сохранявший пользователя, не узнал бы о смене пароля
+    # или блокировке и принимал бы старую сессию до истечения записи.
+    raise ImproperlyConfigured(
+        'CachedModelBackend требует общего для воркеров кэша, '
+        'а не LocMemCache')
+
+# Комментарии в реальном времени доходят до страниц, открытых
+# в других воркерах, только через общий кэш.
+PUBSUB_BROKER = os.environ.get(
+    'DJANGO_PUBSUB_BROKER', 'core.pubsub.CacheBroker')
+if (PUBSUB_BROKER == 'core.pubsub.CacheBroker'
+        and CACHES['default']['BACKEND'] in (
+            'django.core.cache.backends.locmem.LocMemCache',
+            'django.core.cache.backends.filebased.FileBasedCache',
+            'django.core.cache.backends.db.DatabaseCache',
+            'core.cache.InstrumentedLocMemCache')):
+    # Счётчик канала у LocMemCache свой в каждом воркере, а FileBasedCache
+    # и DatabaseCache увеличивают его без блокировки и со сроком TIMEOUT:
+    # два воркера получат одну позицию, а тихий канал начнёт счёт заново.
+    raise ImproperlyConfigured(
+        'CacheBroker требует кэша с атомарным incr: memcached или '
+        'core.cache.InstrumentedFileBasedCache')
+
+STATIC_ROOT = os.environ.get('DJANGO_STATIC_ROOT', STATIC_ROOT)
+MEDIA_ROOT = os.environ.get('DJANGO_MEDIA_ROOT', MEDIA_ROOT)
+STATIC_SERVE = env_bool('DJANGO_STATIC_SERVE', False)
+
+# Прокси перед gunicorn, обычно на той же машине. Адреса клиентов
+# из X-Forwarded-For нужны лимитам запросов.
+TRUSTED_PROXIES = env_list('DJANGO_TRUSTED_PROXIES', ['127.0.0.1', '::1'])
+
+# HTTPS завершается на прокси, который передаёт X-Forwarded-Proto.
+HTTPS = env_bool('DJANGO_HTTPS', True)
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SECURE_SSL_REDIRECT = HTTPS
+SESSION_COOKIE_SECURE = HTTPS
+CSRF_COOKIE_SECURE = HTTPS
+SECURE_HSTS_SECONDS = env_int('DJANGO_HSTS_SECONDS', 3600 if HTTPS else 0)
+SECURE_CONTENT_TYPE_NOSNIFF = True
+SECURE_BROWSER_XSS_FILTER = True
+X_FRAME_OPTIONS = 'DENY'
+
+# Прогрев в мастере gunicorn при preload_app, см. core.warmup.
+WSGI_WARMUP = env_bool('DJANGO_WARMUP', True)
+
+METRICS_DIR = os.environ.get('DJANGO_METRICS_DIR', METRICS_DIR)
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+TRACING_SAMPLE_RATE = float(os.environ.get(
+    'DJANGO_TRACING_SAMPLE_RATE', TRACING_SAMPLE_RATE))
+TRACING_FILE = os.environ.get('DJANGO_TRACING_FILE', TRACING_FILE)
+TRACING_TRUST_SAMPLED = env_bool('DJANGO_TRACING_TRUST_SAMPLED', False)
+PROFILING_TOKEN = os.environ.get('DJANGO_PROFILING_TOKEN', '')
+PROFILING_SIGNAL = os.environ.get('DJANGO_PROFILING_SIGNAL', PROFILING_SIGNAL)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+}